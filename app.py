@@ -4,9 +4,67 @@ import datetime
 import os
 
 # Custom Modules
+import perf
 import utils
-import database as db
-import market_data as md
+from portfolio import analytics, scenarios, valuation, history
+
+# Storage and provider modules are resolved on first use (see utils.LazyModule)
+db = utils.LazyModule("database")
+md = utils.LazyModule("market_data")
+price_service = utils.LazyModule("price_service")
+quote_stream = utils.LazyModule("quote_stream")
+importer = utils.LazyModule("importer")
+
+# Portfolio Evolution ranges (days back from today; None = since the first transaction)
+CHART_RANGES = {"1M": 30, "3M": 91, "6M": 182, "YTD": "YTD", "1Y": 365, "All": None}
+
+def chart_since(chart_range):
+    """First date shown for a Portfolio Evolution range, or None for the whole history"""
+    days = CHART_RANGES[chart_range]
+    today = datetime.date.today()
+    if days is None:
+        return None
+    if days == "YTD":
+        return today.replace(month=1, day=1)
+    return today - datetime.timedelta(days=days)
+
+def get_price_service():
+    """Shared background refresher (one per process, not per session)"""
+    return price_service.get_service(
+        lambda: db.load_settings().get("ticker_config", {}),
+        utils.get_secret("price_refresher"),
+    )
+
+def get_quote_stream(price_svc):
+    """Shared Binance websocket consumer; pushed prices also feed the shared price store"""
+    return quote_stream.get_stream(
+        on_price=lambda ticker, price: price_svc.store.put_quote(ticker, price, "USD", "Binance API")
+    )
+
+def show_performance_panel(recorder):
+    """Sidebar breakdown of where this render's time went"""
+    if recorder is None:
+        return
+    with st.sidebar.expander("⏱ Performance", expanded=True):
+        st.metric("Render time", f"{recorder.elapsed_ms():,.0f} ms", help="Up to the point this panel was drawn")
+        st.caption(f"Upstream calls this render: **{recorder.upstream_calls()}**")
+        summary = recorder.summary()
+        if summary:
+            st.dataframe(
+                pd.DataFrame(summary),
+                column_config={
+                    "total_ms": st.column_config.NumberColumn("total ms", format="%.1f"),
+                    "max_ms": st.column_config.NumberColumn("max ms", format="%.1f"),
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+        if recorder.counters:
+            st.dataframe(
+                pd.DataFrame(sorted(recorder.counters.items()), columns=["counter", "value"]),
+                hide_index=True,
+                use_container_width=True
+            )
 
 def main():
     st.set_page_config(page_title="Investment Tracker", layout="wide")
@@ -24,8 +82,10 @@ def main():
         st.stop()
 
     st.sidebar.title("Navigation")
-    menu = ["Dashboard", "New Entry", "Settings"]
+    menu = ["Dashboard", "New Entry", "Bulk Import", "Settings"]
     choice = st.sidebar.radio("Go to", menu)
+    perf_cfg = utils.get_secret("performance") or {}
+    show_perf = st.sidebar.toggle("⏱ Performance panel", value=bool(perf_cfg.get("panel", False)))
 
 
     if choice == "New Entry":
@@ -110,17 +170,81 @@ def main():
                         "Total_Cost": total_cost
                     }
 
-                    df = db.load_data()
-                    df = pd.concat([df, pd.DataFrame([new_entry])], ignore_index=True)
-                    db.save_data(df)
-                    st.session_state["prices_updated"] = False # Reset flag to force update on dashboard
+                    db.append_investments(pd.DataFrame([new_entry]))
+                    get_price_service().request_refresh() # Pick up prices for the new holding early
                     st.success(f"Saved: {quantity} {ticker} for {total_cost:,.2f} {min_buy}")
 
+    elif choice == "Bulk Import":
+        st.subheader("Bulk Import Transactions")
+        st.markdown("Import a CSV export from your broker or exchange. Rows already in the ledger are skipped.")
+
+        platforms_df = db.load_platforms()
+        platform_names = platforms_df["Platform"].tolist() if not platforms_df.empty else ["Manual"]
+
+        col1, col2 = st.columns(2)
+        fmt = col1.selectbox("File format", importer.FORMATS)
+        platform = col2.selectbox("Platform", platform_names, help="Used for commissions (and as Platform unless mapped)")
+        uploaded = st.file_uploader("CSV file", type=["csv"])
+
+        mapping = {}
+        if uploaded is not None and fmt == importer.GENERIC:
+            columns = importer.read_header(uploaded)
+            st.markdown("**Column mapping**")
+            map_cols = st.columns(4)
+            for i, field in enumerate(importer.GENERIC_FIELDS):
+                required = field in importer.REQUIRED_GENERIC_FIELDS
+                options = columns if required else ["(none)"] + columns
+                choice_col = map_cols[i % 4].selectbox(field, options, key=f"map_{field}")
+                mapping[field] = None if choice_col == "(none)" else choice_col
+            if not mapping.get("Currency"):
+                mapping["default_currency"] = st.selectbox("Currency for all rows", ["USD", "EUR", "ARS", "USDT"])
+
+        with st.expander("Advanced"):
+            batch_size = st.number_input("Rows per write batch", min_value=50, max_value=5000, value=500, step=50)
+            dry_run = st.checkbox("Dry run (parse and deduplicate without writing)")
+
+        if uploaded is not None and st.button("📥 Import"):
+            size = uploaded.size or 1
+            bar = st.progress(0.0, text="Starting import...")
+
+            def report(stats):
+                done = min(uploaded.tell() / size, 1.0)
+                bar.progress(done, text=(
+                    f"Read {stats['read']:,} rows · {stats['duplicates']:,} duplicates · "
+                    f"{stats['written']:,} {'ready' if dry_run else 'written'} in {stats['batches']} batches"
+                ))
+
+            try:
+                stats = importer.import_csv(
+                    uploaded, fmt, platform, platforms_df, db.load_data(since=datetime.date.min),
+                    mapping=mapping, batch_size=int(batch_size), dry_run=dry_run, progress=report
+                )
+            except (ValueError, KeyError) as e:
+                st.error(f"Could not parse file: {e}")
+            except db.DatabaseError as e:
+                partial = getattr(e, "stats", None) or {"written": 0, "batches": 0}
+                st.error(f"Import stopped: {e}")
+                st.warning(
+                    f"{partial['written']:,} rows in {partial['batches']} batches were written before the error. "
+                    "Re-running the import is safe: rows already in the ledger are skipped."
+                )
+                if partial["written"]:
+                    get_price_service().request_refresh(reload_tickers=True)
+            else:
+                bar.progress(1.0, text="Done")
+                verb = "would be imported" if dry_run else "imported"
+                st.success(f"{stats['written']:,} rows {verb}; {stats['duplicates']:,} duplicates and {stats['invalid']:,} invalid rows skipped.")
+                if stats["written"] and not dry_run:
+                    get_price_service().request_refresh(reload_tickers=True)
+
     elif choice == "Dashboard":
         st.subheader("Holdings Dashboard")
         
-        # 1. Fetch and Display FX Rates
-        dolar_rates = md.get_dolar_rates()
+        # 1. Display FX Rates from the shared price store (never blocks on the network)
+        price_svc = get_price_service()
+        dolar_rates, fx_fetched_at = price_svc.store.get_fx()
+        if fx_fetched_at is None:
+            st.caption("⏳ Live quotes are warming up, refresh in a few seconds.")
         col_mep, col_ccl = st.columns(2)
         col_mep.metric("Dólar MEP", f"${dolar_rates['MEP']:,.2f}")
         col_ccl.metric("Dólar CCL", f"${dolar_rates['CCL']:,.2f}")
@@ -129,192 +253,156 @@ def main():
 
         if not df.empty:
             mep_rate = dolar_rates.get("MEP", 0.0)
+            if mep_rate <= 0 and (df["Currency"] == "ARS").any():
+                st.warning("Dólar MEP is unavailable, so ARS costs below are not converted to USD. Refresh in a few seconds.")
             
-            # Convert all costs to USD for accurate calculation and grouping
-            def to_usd(row):
-                if row["Currency"] == "ARS" and mep_rate > 0:
-                    return row["Total_Cost"] / mep_rate
-                return row["Total_Cost"]
-            
-            df["Total_Cost_USD"] = df.apply(to_usd, axis=1)
+            with perf.span("compute.grouping", rows=len(df)):
+                # Convert all costs to USD for accurate calculation and grouping
+                df["Total_Cost_USD"] = valuation.costs_to_usd(df, mep_rate)
 
-            # Group by Platform and Ticker - Summing the USD costs
-            grouped_df = df.groupby(["Platform", "Ticker"])[["Quantity", "Total_Cost_USD"]].sum().reset_index()
-            # Rename for consistency with downstream code
-            grouped_df = grouped_df.rename(columns={"Total_Cost_USD": "Total_Cost"})
+                # Group by Platform and Ticker - Summing the USD costs
+                grouped_df = valuation.group_holdings(df)
 
             # Load settings for ticker source
             settings = db.load_settings()
             ticker_config = settings.get("ticker_config", {})
-
-            grouped_df["Avg Buy Price"] = grouped_df["Total_Cost"] / grouped_df["Quantity"]
             
-            # Helper to get current price (logic: if Binance API, fetch; else 0)
+            # Session prices start from the shared store; manual edits win until a newer quote arrives
             if "Current Price (USD)" not in st.session_state:
                  st.session_state["Current Price (USD)"] = {}
             if "Native Price" not in st.session_state:
                  st.session_state["Native Price"] = {} # Store {Ticker: {Price: 100, Currency: ARS}}
-
-            # Auto-update logic
-            should_update = st.button("🔄 Update Live Prices")
-            if not st.session_state.get("prices_updated", False) and not grouped_df.empty:
-                should_update = True
-
-            if should_update:
-                with st.spinner("Fetching prices..."):
-                    mep_rate = dolar_rates.get("MEP", 0.0)
-                    
-                    for index, row in grouped_df.iterrows():
-                        ticker = row["Ticker"]
-                        source = ticker_config.get(ticker, "Manual")
-                        
-                        if source != "Manual":
-                            price, currency = md.get_market_price(ticker, source)
-                            
-                            if price > 0:
-                                # Store Native Info
-                                st.session_state["Native Price"][ticker] = {"price": price, "currency": currency}
-                                
-                                # Convert to USD for Total
-                                price_usd = 0.0
-                                if currency == "USD" or currency == "USDT":
-                                    price_usd = price
-                                elif currency == "ARS" and mep_rate > 0:
-                                    price_usd = price / mep_rate
-                                else:
-                                    price_usd = 0.0 # Unknown conversion
-                                
-                                st.session_state["Current Price (USD)"][ticker] = price_usd
-
-                    st.session_state["prices_updated"] = True
-                    st.success("Prices updated!")
-
-            # Apply prices from session state
-            # We map the session state prices to the dataframe
-            grouped_df["Current Price (USD)"] = grouped_df["Ticker"].map(st.session_state["Current Price (USD)"]).fillna(0.0)
-
-            # Pre-calculate derived columns for the editor
-            grouped_df["Updated Value (USD)"] = grouped_df["Quantity"] * grouped_df["Current Price (USD)"]
-            grouped_df["Result ($)"] = grouped_df["Updated Value (USD)"] - grouped_df["Total_Cost"]
-            grouped_df["Result (%)"] = grouped_df.apply(
-                lambda row: f"{(row['Updated Value (USD)'] / row['Total_Cost'] - 1):+.2%}" if row["Total_Cost"] > 0 else "0.00%", 
-                axis=1
+            if "Quote Times" not in st.session_state:
+                 st.session_state["Quote Times"] = {} # Store {Ticker: fetched_at of the applied quote}
+
+            if st.button("🔄 Update Live Prices"):
+                price_svc.request_refresh()
+                st.toast("Refresh requested, new quotes will appear on the next update.")
+
+            # Optional streaming mode: Binance quotes are pushed into the shared price store and
+            # the holdings grid and totals re-render from it inside a fragment, at the throttled
+            # rate and without rerunning the rest of the page.
+            streaming_cfg = utils.get_secret("streaming") or {}
+            binance_tickers = sorted(t for t in grouped_df["Ticker"].unique() if ticker_config.get(t) == "Binance API")
+            live_mode = st.sidebar.toggle(
+                "⚡ Live streaming (Binance)",
+                value=bool(streaming_cfg.get("enabled", False)),
+                disabled=not binance_tickers,
             )
-            
-            # Enrich with Native Price info for display
-            def get_native_display(ticker):
-                data = st.session_state.get("Native Price", {}).get(ticker)
-                if data:
-                    return f"{data['price']:,.2f} {data['currency']}"
-                return "-"
-            
-            grouped_df["Live Price (Native)"] = grouped_df["Ticker"].apply(get_native_display)
+            # With the toggle off (or no Binance holdings) nobody feeds the shared stream and it shuts down once idle
+            stream = get_quote_stream(price_svc) if live_mode and binance_tickers else None
 
-            # Filter columns to show for editing
-            edit_cols = ["Platform", "Ticker", "Quantity", "Total_Cost", "Avg Buy Price", "Current Price (USD)", "Updated Value (USD)", "Result ($)", "Result (%)"]
-            
-            # Calculate Totals for the editor
-            total_cost_editor = grouped_df["Total_Cost"].sum()
-            total_value_editor = grouped_df["Updated Value (USD)"].sum()
-            total_result_editor = grouped_df["Result ($)"].sum()
-            total_result_pct_editor = (total_value_editor / total_cost_editor - 1) if total_cost_editor > 0 else 0
-            
-            total_row_editor = pd.DataFrame([{
-                "Platform": "TOTAL",
-                "Ticker": "",
-                "Quantity": "",
-                "Total_Cost": f"{total_cost_editor:,.2f}",
-                "Avg Buy Price": "",
-                "Current Price (USD)": "",
-                "Updated Value (USD)": f"{total_value_editor:,.2f}",
-                "Result ($)": f"{total_result_editor:+,.2f}",
-                "Result (%)": f"{total_result_pct_editor:+.2%}"
-            }])
-            
-            # For the editor to show empty strings, we convert the display columns to strings
-            # except Current Price which must stay numeric for editing the other rows.
-            # However, if we mix string and number in Current Price, it becomes object.
-            # Streamlit data_editor handles object columns as TextColumn by default.
-            
-            df_for_editor = grouped_df[edit_cols].copy()
-            # Format numeric columns as strings for the editor to match the TOTAL row style
-            # but KEEP Current Price as numeric for editing
-            for col in ["Quantity", "Total_Cost", "Avg Buy Price", "Updated Value (USD)", "Result ($)"]:
-                df_for_editor[col] = df_for_editor[col].apply(lambda x: f"{x:,.6f}" if "Quantity" in col or "Price" in col else f"{x:,.2f}")
-            
-            df_for_editor = pd.concat([df_for_editor, total_row_editor], ignore_index=True)
+            @st.fragment(run_every=float(streaming_cfg.get("refresh_seconds", 2)) if stream else None)
+            def holdings_grid():
+                if stream is not None:
+                    stream.set_tickers(binance_tickers)
 
-            edited_df = st.data_editor(
-                df_for_editor,
-                column_config={
-                    "Platform": st.column_config.TextColumn(disabled=True),
-                    "Ticker": st.column_config.TextColumn(disabled=True),
-                    "Quantity": st.column_config.TextColumn(disabled=True),
-                    "Total_Cost": st.column_config.TextColumn("Total Cost Basis", disabled=True),
-                    "Avg Buy Price": st.column_config.TextColumn(disabled=True),
-                    "Current Price (USD)": st.column_config.TextColumn(help="Edit prices in the asset rows. TOTAL row is read-only."),
-                    "Updated Value (USD)": st.column_config.TextColumn(disabled=True),
-                    "Result ($)": st.column_config.TextColumn(disabled=True),
-                    "Result (%)": st.column_config.TextColumn(disabled=True)
-                },
-                hide_index=True,
-                use_container_width=True
-            )
-            
-            # Sync edits back to session state
-            if not edited_df.empty:
-                changes = False
-                for index, row in edited_df.iterrows():
-                    if row["Platform"] == "TOTAL":
+                held_tickers = set(grouped_df["Ticker"])
+                for ticker, quote in price_svc.store.get_quotes().items():
+                    if ticker not in held_tickers:
                         continue
-                    
-                    ticker = row["Ticker"]
-                    try:
-                        # Convert back to float since it's now string in the editor
-                        new_price = utils.safe_float(str(row["Current Price (USD)"]))
-                        if st.session_state["Current Price (USD)"].get(ticker) != new_price:
-                            st.session_state["Current Price (USD)"][ticker] = new_price
-                            changes = True
-                    except:
-                        pass
-                
-                if changes:
+                    if st.session_state["Quote Times"].get(ticker, 0.0) >= quote["fetched_at"]:
+                        continue
+                    price, currency = quote["price"], quote["currency"]
+
+                    # Store Native Info
+                    st.session_state["Native Price"][ticker] = {"price": price, "currency": currency}
+
+                    # Convert to USD for Total
+                    price_usd = valuation.price_to_usd(price, currency, mep_rate)
+                    if price_usd is None:
+                        continue # Unknown conversion (or MEP not loaded yet), retry next run
+
+                    st.session_state["Current Price (USD)"][ticker] = price_usd
+                    st.session_state["Quote Times"][ticker] = quote["fetched_at"]
+
+                # Apply prices from session state and pre-calculate derived columns for the editor
+                with perf.span("compute.valuation"):
+                    valued_df = valuation.value_holdings(grouped_df, st.session_state["Current Price (USD)"])
+
+                # Enrich with Native Price info for display
+                def get_native_display(ticker):
+                    data = st.session_state.get("Native Price", {}).get(ticker)
+                    if data:
+                        return f"{data['price']:,.2f} {data['currency']}"
+                    return "-"
+
+                valued_df["Live Price (Native)"] = valued_df["Ticker"].apply(get_native_display)
+
+                # Filter columns to show for editing
+                edit_cols = valuation.VALUATION_COLUMNS
+
+                # Columns keep their numeric dtypes; formatting is handled by column_config
+                # and totals are rendered as metrics outside the grid.
+                df_for_editor = valued_df[edit_cols].copy()
+
+                edited_df = st.data_editor(
+                    df_for_editor,
+                    column_config={
+                        "Platform": st.column_config.TextColumn(disabled=True),
+                        "Ticker": st.column_config.TextColumn(disabled=True),
+                        "Quantity": st.column_config.NumberColumn(format="%.8f", disabled=True),
+                        "Total_Cost": st.column_config.NumberColumn("Total Cost Basis", format="%.2f", disabled=True),
+                        "Avg Buy Price": st.column_config.NumberColumn(format="%.8f", disabled=True),
+                        "Current Price (USD)": st.column_config.NumberColumn(format="%.8f", min_value=0.0, help="Edit to override the live price for this asset."),
+                        "Updated Value (USD)": st.column_config.NumberColumn(format="%.2f", disabled=True),
+                        "Result ($)": st.column_config.NumberColumn(format="%+.2f", disabled=True),
+                        "Result (%)": st.column_config.NumberColumn(format="%+.2f%%", disabled=True)
+                    },
+                    hide_index=True,
+                    use_container_width=True
+                )
+                if stream is not None:
+                    status = "connected" if stream.is_connected() else "reconnecting (REST snapshots)"
+                    streamed = len(set(stream.last_prices()) & set(binance_tickers))
+                    st.caption(f"⚡ Stream {status} · {streamed}/{len(binance_tickers)} symbols priced · {stream.reconnects} reconnects")
+
+                if edited_df.empty:
+                    return edited_df, None
+
+                # Sync edits back to session state
+                # Only Current Price is editable: diff it against what we fed the editor
+                new_prices = pd.to_numeric(edited_df["Current Price (USD)"], errors="coerce").fillna(0.0)
+                old_prices = df_for_editor["Current Price (USD)"]
+                changed = new_prices.ne(old_prices)
+
+                if changed.any():
+                    updates = dict(zip(edited_df.loc[changed, "Ticker"], new_prices[changed]))
+                    st.session_state["Current Price (USD)"].update(updates)
                     st.rerun()
 
-                # Proceed with Totals using only data rows (excluding the TOTAL row from editor)
-                data_df = edited_df[edited_df["Platform"] != "TOTAL"].copy()
-                
-                # Convert string columns back to numeric for math and formatting (they were formatted for display in the editor)
-                for col in ["Quantity", "Total_Cost", "Avg Buy Price", "Current Price (USD)", "Updated Value (USD)", "Result ($)"]:
-                    data_df[col] = data_df[col].apply(utils.safe_float)
-                
-                total_value = data_df["Updated Value (USD)"].sum()
-                total_cost = data_df["Total_Cost"].sum()
-                total_result = data_df["Result ($)"].sum()
-                total_result_pct = (total_value / total_cost - 1) if total_cost > 0 else 0.0
-                
+                totals = valuation.portfolio_totals(edited_df)
                 st.divider()
-                st.metric("Total Portfolio Value (USD)", f"${total_value:,.2f}", delta=f"${total_result:,.2f} ({total_result_pct:+.2%})")
+                col_value, col_cost = st.columns(2)
+                col_value.metric("Total Portfolio Value (USD)", f"${totals['value']:,.2f}", delta=f"${totals['result']:,.2f} ({totals['result_pct']:+.2%})")
+                col_cost.metric("Total Cost Basis (USD)", f"${totals['cost']:,.2f}")
+                return edited_df, totals
+
+            edited_df, totals = holdings_grid()
+
+            if not edited_df.empty:
+                total_value = totals["value"]
+                total_cost = totals["cost"]
+                total_result = totals["result"]
+                total_result_pct = totals["result_pct"]
                 
                 st.subheader("Detailed Breakdown")
                 
                 # Prepare display dataframe using the RAW transactions (df)
                 # Apply current prices to EACH transaction
-                breakdown_df = df.copy()
-                breakdown_df["Current Price (USD)"] = breakdown_df["Ticker"].map(st.session_state["Current Price (USD)"]).fillna(0.0)
-                breakdown_df["Updated Value (USD)"] = breakdown_df["Quantity"] * breakdown_df["Current Price (USD)"]
-                breakdown_df["Result ($)"] = breakdown_df["Updated Value (USD)"] - breakdown_df["Total_Cost_USD"]
-                breakdown_df["Result (%)"] = breakdown_df.apply(
-                    lambda row: (row["Updated Value (USD)"] / row["Total_Cost_USD"] - 1) if row["Total_Cost_USD"] > 0 else 0.0,
-                    axis=1
-                )
+                with perf.span("compute.breakdown"):
+                    breakdown_df = valuation.value_holdings(df, st.session_state["Current Price (USD)"], cost_col="Total_Cost_USD")
 
                 # Select and format columns for display
                 display_cols = ["Date", "Platform", "Ticker", "Quantity", "Price", "Currency", "Total_Cost_USD", "Current Price (USD)", "Updated Value (USD)", "Result ($)", "Result (%)"]
                 display_df = breakdown_df[display_cols].copy()
 
                 # Format Date for display
-                display_df["Date"] = pd.to_datetime(display_df["Date"]).dt.date
+                dates = pd.to_datetime(display_df["Date"], format="mixed")
+                display_df["Date"] = dates.dt.date.astype(str)
+                # Carry-forward rows are the net position of archived years, not transactions
+                carried = breakdown_df["Commission_Type"] == db.CARRY_FORWARD
+                display_df.loc[carried, "Date"] = "Carry-forward to " + dates[carried].dt.year.astype(str)
                 
                 # Format numeric columns as strings
                 display_df["Quantity"] = display_df["Quantity"].apply(lambda x: f"{x:,.6f}")
@@ -323,7 +411,7 @@ def main():
                 display_df["Current Price (USD)"] = display_df["Current Price (USD)"].apply(lambda x: f"{x:,.6f}")
                 display_df["Updated Value (USD)"] = display_df["Updated Value (USD)"].apply(lambda x: f"{x:,.2f}")
                 display_df["Result ($)"] = display_df["Result ($)"].apply(lambda x: f"{x:+,.2f}")
-                display_df["Result (%)"] = display_df["Result (%)"].apply(lambda x: f"{x:+.2%}")
+                display_df["Result (%)"] = display_df["Result (%)"].apply(lambda x: f"{x:+.2f}%")
                 
                 # Create a total row
                 total_row = pd.DataFrame([{
@@ -351,116 +439,118 @@ def main():
                 # --- NEW: Portfolio Progress Chart ---
                 st.divider()
                 st.subheader("📈 Portfolio Evolution")
+                chart_range = st.selectbox("Range", list(CHART_RANGES), index=list(CHART_RANGES).index("1Y"))
                 
                 with st.spinner("Calculating historical progress..."):
                     try:
-                        # 1. Prepare Daily Timeline
-                        df["Date"] = pd.to_datetime(df["Date"])
-                        min_date = df["Date"].min()
-                        today = datetime.date.today()
-                        date_range = pd.date_range(start=min_date, end=today, freq="D")
-                        
-                        # 2. Get Historical Prices
-                        # Get unique tickers and their sources
-                        unique_tickers = df["Ticker"].unique()
-                        tickers_to_fetch = {t: ticker_config.get(t, "Manual") for t in unique_tickers}
-                        
-                        # Add ARS/USD for conversion
-                        # Note: We use ARSUSD=X or just calculate a constant if not found
-                        # To keep it simple and robust, let's fetch it if there are ARS assets
-                        has_ars = not df[df["Currency"] == "ARS"].empty
-                        if has_ars:
-                            tickers_to_fetch["ARS_USD"] = "Global" # Dummy source for helper
-                            
-                        # Fetch
+                        # 1. Archived periods are only summarized in df; read their partitions if the range reaches them
+                        since = chart_since(chart_range)
+                        history_src = df
+                        carried = df["Commission_Type"] == db.CARRY_FORWARD
+                        if carried.any() and (since is None or pd.to_datetime(df.loc[carried, "Date"], format="mixed").max().date() >= since):
+                            history_src = db.load_data(since=since or datetime.date.min)
+                            history_src["Total_Cost_USD"] = valuation.costs_to_usd(history_src, mep_rate)
+
+                        # 2. Get Historical Prices for every ticker (plus ARS/USD if needed)
+                        min_date = pd.to_datetime(history_src["Date"], format="mixed").min()
+                        if since is not None:
+                            min_date = max(min_date, pd.Timestamp(since - datetime.timedelta(days=7)))
+                        tickers_to_fetch = history.history_tickers(history_src, ticker_config)
                         historical_prices = md.get_historical_prices(tickers_to_fetch, min_date)
-                        
-                        # Fix ARS_USD if dummy used
-                        if "ARS_USD" in historical_prices.columns:
-                            # Yahoo returns ARS per USD usually for ARS=X, check scale
-                            # Actually ARSUSD=X is USD per 1 ARS. 
-                            # Let's assume we want to convert ARS cost to USD.
-                            pass
-
-                        # 3. Calculate Daily Status
-                        # Pre-convert transactions to USD cost (using current MEP for simplicity if history fails)
-                        mep_rate = dolar_rates.get("MEP", 1.0)
-                        def to_usd(row):
-                            if row["Currency"] in ["USD", "USDT"]:
-                                return row["Total_Cost"]
-                            return row["Total_Cost"] / mep_rate
-                        
-                        df["Total_Cost_USD"] = df.apply(to_usd, axis=1)
-                        
-                        chart_data = []
-                        for d in date_range:
-                            # Transactions up to this day
-                            mask = df["Date"] <= d
-                            current_df = df[mask]
-                            
-                            if current_df.empty:
-                                continue
-                                
-                            invested_capital = current_df["Total_Cost_USD"].sum()
-                            
-                            # Market Value
-                            market_value = 0.0
-                            # Group by ticker to get current cumulative quantity
-                            holdings = current_df.groupby("Ticker")["Quantity"].sum()
-                            
-                            for t, qty in holdings.items():
-                                if t in historical_prices.columns:
-                                    # Get price for that day or last available
-                                    day_prices = historical_prices[t].loc[:d]
-                                    if not day_prices.empty:
-                                        p = day_prices.iloc[-1]
-                                        if pd.isna(p):
-                                            # If still NaN, try to use the last non-nan price in the series
-                                            p = day_prices.dropna().iloc[-1] if not day_prices.dropna().empty else 0.0
-                                        market_value += qty * p
-                                    else:
-                                        # Fallback to cost basis if no price info yet to avoid NaN gap
-                                        market_value += current_df[current_df["Ticker"] == t]["Total_Cost_USD"].sum()
-                                else:
-                                    # Fallback to last known session price if it's today
-                                    if d.date() == today:
-                                         market_value += qty * st.session_state["Current Price (USD)"].get(t, 0.0)
-                                    else:
-                                        # Fallback to cost basis for historical days without price info
-                                        market_value += current_df[current_df["Ticker"] == t]["Total_Cost_USD"].sum()
-
-                            chart_data.append({
-                                "Date": d,
-                                "Invested Capital (USD)": invested_capital,
-                                "Market Value (USD)": market_value
-                            })
-                            
-                        if chart_data:
-                            history_df = pd.DataFrame(chart_data).set_index("Date")
+
+                        # 3. Calculate Daily Status (costs already converted to USD above)
+                        with perf.span("compute.history", rows=len(history_src)):
+                            history_df = history.portfolio_history(
+                                history_src, historical_prices, today_prices=st.session_state["Current Price (USD)"]
+                            )
+                        if since is not None:
+                            history_df = history_df[history_df.index >= pd.Timestamp(since)]
+
+                        if not history_df.empty:
                             # Handle any remaining NaNs in the final dataframe
-                            history_df = history_df.fillna(method='ffill').fillna(0)
+                            history_df = history_df.ffill().fillna(0)
                             st.line_chart(history_df, use_container_width=True)
                             
                             # Summary metric for the chart
-                            last_market_val = chart_data[-1]["Market Value (USD)"]
-                            last_invested = chart_data[-1]["Invested Capital (USD)"]
-                            
-                            # Ensure we don't show NaN if values are missing
-                            if pd.isna(last_market_val) or pd.isna(last_invested):
-                                # Recalculate from history_df to be safe
-                                last_market_val = history_df["Market Value (USD)"].iloc[-1]
-                                last_invested = history_df["Invested Capital (USD)"].iloc[-1]
+                            last_market_val = history_df["Market Value (USD)"].iloc[-1]
+                            last_invested = history_df["Invested Capital (USD)"].iloc[-1]
 
                             total_gain = last_market_val - last_invested
                             total_gain_pct = (last_market_val / last_invested - 1) if last_invested > 0 else 0
                             
                             st.caption(f"Historical result: **${total_gain:,.2f} ({total_gain_pct:+.2%})** relative to total investment.")
+
+                            # Risk/return analytics: TWR, volatility and drawdown over the chart range, XIRR since inception
+                            st.markdown("#### Performance")
+                            with perf.span("compute.analytics", rows=len(history_src)):
+                                twr = analytics.time_weighted_return(history_df)
+                                twr_annual = analytics.time_weighted_return(history_df, annualize=True)
+                                volatility = analytics.rolling_volatility(history_df)
+                                dd = analytics.drawdown(history_df)
+                                xirr_total = analytics.xirr_by(history_src, edited_df)
+                                xirr_ticker = analytics.xirr_by(history_src, edited_df, by="Ticker")
+                                xirr_platform = analytics.xirr_by(history_src, edited_df, by="Platform")
+
+                            col_twr, col_xirr, col_vol, col_dd = st.columns(4)
+                            col_twr.metric(f"Time-weighted ({chart_range})", f"{twr:+.2%}", help=f"Annualized: {twr_annual:+.2%}")
+                            col_xirr.metric("Money-weighted (XIRR)", f"{xirr_total:+.2%}" if pd.notna(xirr_total) else "n/a",
+                                            help="Annualized, since the first transaction")
+                            col_vol.metric("Volatility (30d, ann.)", f"{volatility.iloc[-1]:.2%}" if volatility.notna().any() else "n/a")
+                            col_dd.metric(f"Max Drawdown ({chart_range})", f"{dd.min():.2%}" if not dd.empty else "n/a")
+                            if (history_src["Commission_Type"] == db.CARRY_FORWARD).any():
+                                st.caption("Archived years enter XIRR as one flow at year end; choose the **All** range for exact figures.")
+
+                            with st.expander("Details"):
+                                col_t, col_p = st.columns(2)
+                                col_t.dataframe(xirr_ticker.rename("XIRR (%)").mul(100).round(2), use_container_width=True)
+                                col_p.dataframe(xirr_platform.rename("XIRR (%)").mul(100).round(2), use_container_width=True)
+                                st.line_chart(pd.DataFrame({"Volatility (30d)": volatility, "Drawdown": dd}), use_container_width=True)
                         else:
                             st.info("Not enough historical data to generate chart yet.")
                             
                     except Exception as e:
                         st.error(f"Error generating chart: {e}")
 
+                # --- What-if scenarios (Monte Carlo) ---
+                st.divider()
+                st.subheader("🎲 What-if Scenarios")
+                scenario_cfg = utils.get_secret("scenarios") or {}
+                with st.form("scenario_form"):
+                    col1, col2, col3 = st.columns(3)
+                    n_paths = col1.number_input("Paths", min_value=100, max_value=100_000, value=10_000, step=1000)
+                    horizon = col2.number_input("Horizon (days)", min_value=5, max_value=1825, value=365, step=5)
+                    lookback = col3.selectbox("History to sample", [1, 2, 3, 5], index=1, format_func=lambda y: f"{y}Y")
+                    col4, col5 = st.columns(2)
+                    method = col4.selectbox("Price paths", scenarios.METHODS,
+                                            help="bootstrap: resample whole historical days; parametric: correlated normal returns")
+                    devaluation = col5.selectbox("ARS/MEP scenario", list(scenarios.DEVALUATION_SCENARIOS),
+                                                 help="Applied to ARS-priced (BYMA) positions")
+                    run_scenarios = st.form_submit_button("▶️ Run Simulation")
+
+                if run_scenarios:
+                    with st.spinner("Simulating..."):
+                        values_usd, ars_tickers, to_fetch = scenarios.holdings_inputs(edited_df, ticker_config)
+                        start = pd.Timestamp.today().normalize() - pd.DateOffset(years=lookback)
+                        sample_prices = md.get_historical_prices(to_fetch, start)
+                        with perf.span("compute.scenarios", paths=int(n_paths), horizon=int(horizon), tickers=len(values_usd)):
+                            result = scenarios.simulate(
+                                values_usd, sample_prices, ars_tickers, horizon=int(horizon), n_paths=int(n_paths),
+                                method=method, devaluation=devaluation,
+                                workers=int(scenario_cfg.get("workers", 0)),
+                                max_chunk_mb=scenario_cfg.get("max_chunk_mb", 64),
+                            )
+                        st.session_state["scenario_result"] = (devaluation, result["percentiles"], scenarios.summarize(result))
+
+                if "scenario_result" in st.session_state:
+                    scenario_name, fan_df, summary = st.session_state["scenario_result"]
+                    col_p5, col_p50, col_p95, col_loss = st.columns(4)
+                    col_p5.metric("Pessimistic (P5)", f"${summary['P5']:,.2f}", delta=f"${summary['P5'] - summary['start']:,.2f}")
+                    col_p50.metric("Median (P50)", f"${summary['P50']:,.2f}", delta=f"${summary['P50'] - summary['start']:,.2f}")
+                    col_p95.metric("Optimistic (P95)", f"${summary['P95']:,.2f}", delta=f"${summary['P95'] - summary['start']:,.2f}")
+                    col_loss.metric("Probability of Loss", f"{summary['prob_loss']:.1%}", help=f"95% VaR: ${summary['var_95']:,.2f}")
+                    st.line_chart(fan_df, use_container_width=True)
+                    st.caption(f"Portfolio value percentiles (USD) per day ahead · ARS/MEP scenario: **{scenario_name}**.")
+
         else:
             st.info("No investments found. Go to 'New Entry' to add some.")
 
@@ -483,6 +573,41 @@ def main():
             stock_key = "YOUR_KEY"
             ```
             
+            Optionally enable Binance websocket streaming by default:
+            ```toml
+            [streaming]
+            enabled = true
+            refresh_seconds = 2
+            ```
+            
+            Optionally show the performance panel by default and log timings as JSON lines:
+            ```toml
+            [performance]
+            panel = true
+            json_logs = true
+            ```
+            
+            Optionally tune the shared background price refresher (seconds):
+            ```toml
+            [price_refresher]
+            max_staleness = 1800
+            jitter = 0.1
+            max_backoff = 1800
+            min_refresh = 15
+            
+            [price_refresher.intervals]
+            "Binance API" = 30
+            "Argentina (BYMA)" = 300
+            FX = 300
+            ```
+            
+            Optionally spread What-if simulations over worker processes and bound their memory:
+            ```toml
+            [scenarios]
+            workers = 4
+            max_chunk_mb = 64
+            ```
+            
             **Streamlit Cloud:**
             Go to App Settings -> Secrets and paste the same content.
             """)
@@ -518,9 +643,12 @@ def main():
         )
         
         if st.button("💾 Save Platform Settings"):
-            db.save_platforms(edited_platforms_df)
-            st.success("Platform settings saved!")
-            st.rerun()
+            try:
+                db.save_platforms(edited_platforms_df)
+                st.success("Platform settings saved!")
+                st.rerun()
+            except db.DatabaseError as e:
+                st.error(str(e))
 
         st.divider()
 
@@ -565,11 +693,51 @@ def main():
                 
                 settings["ticker_config"] = new_config
                 db.save_settings(settings)
+                get_price_service().request_refresh(reload_tickers=True)
                 st.success("Ticker settings saved!")
                 st.rerun()
         else:
             st.info("No tickers found yet. Add some investments first.")
 
+        st.divider()
+
+        # 4. Ledger Archive (time partitions)
+        st.markdown("### Ledger Archive")
+        st.markdown(
+            "Closed years can be moved to their own `Investments_<year>` sheet. The Dashboard then reads "
+            "a per-holding summary of them instead of every transaction; the evolution chart still reads "
+            "the archived sheets when its range reaches them."
+        )
+        open_rows = df[df["Commission_Type"] != db.CARRY_FORWARD] if not df.empty else df
+        years = pd.to_datetime(open_rows["Date"], errors="coerce", format="mixed").dt.year
+        closed = years[years < datetime.date.today().year].value_counts().sort_index()
+        if closed.empty:
+            st.info("Every transaction in the open sheet belongs to the current year.")
+        else:
+            st.dataframe(
+                pd.DataFrame({"Year": closed.index.astype(int), "Transactions": closed.values}),
+                hide_index=True
+            )
+            archive_year = st.selectbox("Year to archive", closed.index.astype(int).tolist())
+            if st.button("🗄️ Archive Year"):
+                try:
+                    moved = db.archive_period(archive_year)
+                    st.success(f"Archived {moved:,} transactions from {archive_year}.")
+                    st.rerun()
+                except db.DatabaseError as e:
+                    st.error(str(e))
+
+    if show_perf:
+        show_performance_panel(perf.current())
+
 
 if __name__ == "__main__":
-    main()
+    if (utils.get_secret("performance") or {}).get("json_logs"):
+        perf.configure_json_logging()
+    recorder = perf.start_render("app")
+    try:
+        main()
+    except db.DatabaseError as e:
+        st.error(str(e))
+    finally:
+        perf.finish_render(recorder)
@@ -0,0 +1,352 @@
+"""
+Local stand-ins for Google Sheets, Binance, Yahoo Finance, dolarapi and the quote stream.
+
+Each service gets a Faults object that adds latency and injects failures, so
+benchmarks can measure both the compute cost and how the app behaves when an
+upstream is slow or flaky. stand_ins() patches database and market_data to use
+them; nothing leaves the process.
+"""
+import contextlib
+import itertools
+import json
+import queue
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+import database
+import market_data
+from quote_stream import StreamProvider
+from bench.synthetic import LEDGER_COLUMNS, base_prices
+
+SERVICES = ["sheets", "binance", "yahoo", "dolarapi"]
+
+
+class InjectedFailure(ConnectionError):
+    """Raised by a stand-in when failure injection triggers"""
+
+
+class Faults:
+    """Latency and failure injection for one stand-in service"""
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.calls = Counter()
+        self.failures = Counter()
+        self._rng = random.Random(seed)
+
+    def hit(self, operation):
+        self.calls[operation] += 1
+        delay = self.latency + self._rng.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            self.failures[operation] += 1
+            raise InjectedFailure(f"injected failure: {operation}")
+
+
+class FakeWorksheet:
+    """The subset of gspread.Worksheet used by database.py"""
+
+    def __init__(self, title, faults, header=None, rows=None):
+        self.title = title
+        self.faults = faults
+        self.header = list(header or [])
+        self.rows = list(rows or [])
+
+    def get_all_records(self, value_render_option=None):
+        self.faults.hit(f"{self.title}.get_all_records")
+        return [dict(zip(self.header, row)) for row in self.rows]
+
+    def append_row(self, row):
+        self.faults.hit(f"{self.title}.append_row")
+        if not self.header:
+            self.header = list(row)
+        else:
+            self.rows.append(list(row))
+
+    def append_rows(self, rows):
+        self.faults.hit(f"{self.title}.append_rows")
+        rows = [list(r) for r in rows]
+        if not self.header and rows:
+            self.header, rows = rows[0], rows[1:]
+        self.rows.extend(rows)
+
+    def clear(self):
+        self.faults.hit(f"{self.title}.clear")
+        self.header = []
+        self.rows = []
+
+
+class FakeSpreadsheet:
+    """The subset of gspread.Spreadsheet used by database.py"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, faults):
+        self.id = f"fake-{next(self._ids)}"  # Keys database's partition cache, like the real spreadsheet id
+        self.faults = faults
+        self._sheets = {}
+
+    @classmethod
+    def from_ledger(cls, ledger, ticker_config, faults):
+        sh = cls(faults)
+        sh._sheets["Investments"] = FakeWorksheet(
+            "Investments", faults, LEDGER_COLUMNS, ledger[LEDGER_COLUMNS].values.tolist()
+        )
+        sh._sheets["Settings"] = FakeWorksheet(
+            "Settings", faults, ["Ticker", "Data Source"], [[t, s] for t, s in ticker_config.items()]
+        )
+        sh._sheets["Platforms"] = FakeWorksheet(
+            "Platforms", faults,
+            ["Platform", "Entry Commission", "Entry Type", "Exit Commission", "Exit Type", "Commission Currency"],
+            [[p, 0.1, "Percentage", 0.1, "Percentage", "USD"] for p in sorted(ledger["Platform"].unique())],
+        )
+        return sh
+
+    def worksheet(self, title):
+        self.faults.hit("worksheet")
+        if title not in self._sheets:
+            import gspread
+            raise gspread.WorksheetNotFound(title)
+        return self._sheets[title]
+
+    def worksheets(self):
+        self.faults.hit("worksheets")
+        return list(self._sheets.values())
+
+    def add_worksheet(self, title, rows=None, cols=None):
+        self.faults.hit("add_worksheet")
+        self._sheets[title] = FakeWorksheet(title, self.faults)
+        return self._sheets[title]
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise market_data.requests.HTTPError(f"{self.status_code} from stand-in")
+
+
+class FakeRequests:
+    """Replaces the requests module inside market_data (Binance and dolarapi routes)"""
+
+    def __init__(self, prices_usd, mep_rate, binance_faults, dolarapi_faults):
+        self.prices_usd = prices_usd
+        self.mep_rate = mep_rate
+        self.binance_faults = binance_faults
+        self.dolarapi_faults = dolarapi_faults
+        # Keep exception classes reachable for code that references requests.<Error>
+        self.HTTPError = market_data.requests.HTTPError
+        self.ConnectionError = market_data.requests.ConnectionError
+
+    def _binance_price(self, symbol):
+        ticker = symbol[:-len("USDT")] if symbol.endswith("USDT") else None
+        if ticker in self.prices_usd:
+            return {"symbol": symbol, "price": f"{self.prices_usd[ticker]:.8f}"}
+        return None
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        parsed = urlparse(url)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        query.update(params or {})
+
+        if parsed.netloc == "dolarapi.com":
+            self.dolarapi_faults.hit(parsed.path)
+            if parsed.path.endswith("/bolsa"):
+                return FakeResponse(200, {"venta": self.mep_rate})
+            if parsed.path.endswith("/contadoconliqui"):
+                return FakeResponse(200, {"venta": self.mep_rate * 1.02})
+            return FakeResponse(404, {})
+
+        if parsed.netloc == "api.binance.com" and parsed.path == "/api/v3/ticker/price":
+            self.binance_faults.hit("ticker/price")
+            if "symbols" in query:
+                symbols = query["symbols"].strip("[]").replace('"', "").split(",")
+                items = [self._binance_price(s) for s in symbols]
+                if None in items:
+                    return FakeResponse(400, {"code": -1121, "msg": "Invalid symbol."})
+                return FakeResponse(200, items)
+            item = self._binance_price(query.get("symbol", ""))
+            return FakeResponse(200, item) if item else FakeResponse(400, {"code": -1121, "msg": "Invalid symbol."})
+
+        return FakeResponse(404, {})
+
+
+class FakeYFinance:
+    """The subset of the yfinance module used by market_data.py"""
+
+    def __init__(self, prices_usd, mep_rate, faults):
+        self.prices_usd = prices_usd
+        self.mep_rate = mep_rate
+        self.faults = faults
+
+    def _resolve(self, symbol):
+        """Return (reference price, currency) for a Yahoo symbol"""
+        if symbol == "ARS=X":
+            return self.mep_rate, "ARS"
+        if symbol.endswith(".BA"):
+            ticker = symbol[:-len(".BA")]
+            if ticker in self.prices_usd:
+                return self.prices_usd[ticker] * self.mep_rate, "ARS"
+        if symbol.endswith("-USD"):
+            ticker = symbol[:-len("-USD")]
+            if ticker in self.prices_usd:
+                return self.prices_usd[ticker], "USD"
+        if symbol in self.prices_usd:
+            return self.prices_usd[symbol], "USD"
+        return None, None
+
+    def _series(self, symbol, index):
+        ref, _ = self._resolve(symbol)
+        if ref is None or len(index) == 0:
+            return pd.DataFrame(columns=["Close"])
+        # Deterministic random walk per symbol that ends at the reference price
+        rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+        steps = rng.normal(0, 0.02, len(index))
+        walk = np.exp(steps[::-1].cumsum()[::-1] - steps[-1])
+        return pd.DataFrame({"Close": ref / walk}, index=index)
+
+    def Ticker(self, symbol):
+        return _FakeTicker(self, symbol)
+
+    def download(self, symbol, start=None, progress=False, **kwargs):
+        self.faults.hit("download")
+        index = pd.bdate_range(start=pd.Timestamp(start).normalize(), end=pd.Timestamp.today().normalize())
+        return self._series(symbol, index)
+
+
+class _FakeTicker:
+    def __init__(self, yf, symbol):
+        self._yf = yf
+        self.symbol = symbol
+        _, currency = yf._resolve(symbol)
+        self.fast_info = type("FastInfo", (), {"currency": currency})()
+
+    def history(self, period="1d", **kwargs):
+        self._yf.faults.hit("history")
+        return self._yf._series(self.symbol, pd.DatetimeIndex([pd.Timestamp.today().normalize()]))
+
+
+class FakeStreamConnection:
+    """In-process connection: push() queues a message, drop() makes recv() fail like a lost socket"""
+
+    def __init__(self, recv_timeout):
+        self.recv_timeout = recv_timeout
+        self.closed = False
+        self._messages = queue.Queue()
+
+    def push(self, message):
+        self._messages.put(message)
+
+    def drop(self):
+        self.closed = True
+        self._messages.put(None)
+
+    def recv(self):
+        if self.closed:
+            raise ConnectionError("connection dropped")
+        try:
+            message = self._messages.get(timeout=self.recv_timeout)
+        except queue.Empty:
+            raise TimeoutError("no message") from None
+        if message is None:
+            raise ConnectionError("connection dropped")
+        return message
+
+    def close(self):
+        self.closed = True
+
+
+class FakeStreamProvider(StreamProvider):
+    """
+    Quote stream stand-in for QuoteStream tests.
+
+    Records every connect (with its tickers), subscribe, unsubscribe and REST snapshot call;
+    push() sends a quote on the open connection and drop() severs it.
+    snapshot_prices is the {ticker: price} table served over "REST".
+    """
+
+    def __init__(self, snapshot_prices, recv_timeout=0.05):
+        self.snapshot_prices = dict(snapshot_prices)
+        self.recv_timeout = recv_timeout
+        self.connects = []
+        self.subscriptions = []
+        self.unsubscriptions = []
+        self.snapshots = []
+        self.conn = None
+        self._connected = threading.Event()
+
+    def connect(self, tickers):
+        self.connects.append(set(tickers))
+        self.conn = FakeStreamConnection(self.recv_timeout)
+        self._connected.set()
+        return self.conn
+
+    def subscribe(self, conn, tickers):
+        self.subscriptions.append(set(tickers))
+
+    def unsubscribe(self, conn, tickers):
+        self.unsubscriptions.append(set(tickers))
+
+    def parse(self, message):
+        data = json.loads(message)
+        return [(data["ticker"], float(data["price"]), data.get("time"))]
+
+    def snapshot(self, tickers):
+        self.snapshots.append(set(tickers))
+        return {t: self.snapshot_prices[t] for t in tickers if t in self.snapshot_prices}
+
+    def push(self, ticker, price, event_time=None):
+        self.conn.push(json.dumps({"ticker": ticker, "price": price, "time": event_time}))
+
+    def drop(self):
+        """Sever the open connection; wait_connected() returns once the stream has reconnected"""
+        self._connected.clear()
+        self.conn.drop()
+
+    def wait_connected(self, timeout=5):
+        return self._connected.wait(timeout)
+
+
+@contextlib.contextmanager
+def stand_ins(ledger, ticker_config, faults=None, mep_rate=1200.0, seed=0):
+    """
+    Patch database and market_data to talk to in-process stand-ins.
+
+    faults maps service name ("sheets", "binance", "yahoo", "dolarapi") to a Faults
+    instance; missing services get no latency and no failures.
+    Yields {"spreadsheet": FakeSpreadsheet, "faults": {service: Faults}}.
+    """
+    faults = {name: (faults or {}).get(name) or Faults() for name in SERVICES}
+    prices_usd = base_prices(list(ticker_config), seed)
+    spreadsheet = FakeSpreadsheet.from_ledger(ledger, ticker_config, faults["sheets"])
+    fake_requests = FakeRequests(prices_usd, mep_rate, faults["binance"], faults["dolarapi"])
+    fake_yf = FakeYFinance(prices_usd, mep_rate, faults["yahoo"])
+
+    def connect():
+        try:
+            faults["sheets"].hit("connect")
+        except InjectedFailure as e:
+            raise database.DatabaseError(f"Database Connection Error: {e}") from e
+        return spreadsheet
+
+    with mock.patch.object(database, "get_db_connection", connect), \
+            mock.patch.object(market_data, "requests", fake_requests), \
+            mock.patch.object(market_data, "_yf", lambda: fake_yf):
+        yield {"spreadsheet": spreadsheet, "faults": faults}
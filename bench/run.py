@@ -0,0 +1,173 @@
+"""
+Dashboard pipeline benchmark on synthetic ledgers with stand-in providers.
+
+    python -m bench.run                                   # 1k/10k/100k rows, compare to baseline
+    python -m bench.run --sizes 1000 1000000 --tickers 200
+    python -m bench.run --latency-ms 80 --failure-rate 0.05
+    python -m bench.run --save-baseline                   # record bench/baseline.json
+
+Stages mirror one Dashboard render: sheet load and parse, holdings aggregation,
+live-price refresh, historical price download, portfolio-history computation and
+save. Each stage reports the median of --repeat runs. When a baseline exists,
+stages slower than baseline * (1 + --tolerance) are reported and the exit code is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+import database as db
+import market_data as md
+from bench.fakes import Faults, stand_ins
+from bench.synthetic import generate_ledger, make_ticker_config
+from portfolio import cli, history, valuation
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+NOISE_FLOOR_S = 0.005  # Differences below this are never reported as regressions
+
+
+def _timed(fn, repeat, max_attempts=None):
+    """
+    Median wall time of repeat successful runs of fn, and its last result.
+    Runs that raise (injected failures) are retried up to max_attempts in total.
+    """
+    max_attempts = max_attempts or repeat * 5
+    times = []
+    result = None
+    error = None
+    for _ in range(max_attempts):
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            error = e
+            continue
+        times.append(time.perf_counter() - start)
+        if len(times) == repeat:
+            break
+    if not times:
+        raise RuntimeError(f"stage failed {max_attempts} times: {error}") from error
+    return statistics.median(times), result
+
+
+def run_size(n_transactions, args):
+    """Run every stage for one ledger size. Returns ({stage: seconds}, upstream call counts)."""
+    ticker_config = make_ticker_config(args.tickers)
+    ledger = generate_ledger(
+        n_transactions,
+        tickers=ticker_config,
+        platforms=[f"Platform {i}" for i in range(args.platforms)],
+        currencies=args.currencies,
+        start=args.start,
+        mep_rate=args.mep_rate,
+        seed=args.seed,
+    )
+    faults = {
+        name: Faults(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                     failure_rate=args.failure_rate, seed=args.seed)
+        for name in ["sheets", "binance", "yahoo", "dolarapi"]
+    }
+
+    timings = {}
+    with stand_ins(ledger, ticker_config, faults=faults, mep_rate=args.mep_rate, seed=args.seed) as env:
+        timings["sheet_load"], df = _timed(db.load_data, args.repeat)
+
+        def aggregate():
+            df["Total_Cost_USD"] = valuation.costs_to_usd(df, args.mep_rate)
+            grouped = valuation.group_holdings(df)
+            return valuation.value_holdings(grouped, {})
+        timings["aggregation"], _ = _timed(aggregate, args.repeat)
+
+        timings["price_refresh"], snapshot = _timed(lambda: cli.fetch_snapshot(ticker_config), args.repeat)
+        prices_usd = cli._usd_prices(snapshot)
+
+        min_date = pd.to_datetime(df["Date"], format="mixed").min()
+        tickers_to_fetch = history.history_tickers(df, ticker_config)
+        timings["history_prices"], historical_prices = _timed(
+            lambda: md.get_historical_prices(tickers_to_fetch, min_date), args.repeat
+        )
+        timings["history"], _ = _timed(
+            lambda: history.portfolio_history(df, historical_prices, today_prices=prices_usd), args.repeat
+        )
+
+        ledger_df = df.drop(columns=["Total_Cost_USD"])
+        timings["save"], _ = _timed(lambda: db.save_data(ledger_df), args.repeat)
+
+        calls = {name: sum(f.calls.values()) for name, f in env["faults"].items()}
+    return timings, calls
+
+
+def compare(results, baseline, tolerance):
+    """Return [(key, baseline_s, current_s)] for stages that regressed"""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if current > base * (1 + tolerance) and current - base > NOISE_FLOOR_S:
+            regressions.append((key, base, current))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="Ledger sizes (transactions); up to 1_000_000")
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--platforms", type=int, default=5)
+    parser.add_argument("--currencies", nargs="+", default=["USD", "USDT", "ARS"])
+    parser.add_argument("--start", default="2019-01-01", help="First transaction date")
+    parser.add_argument("--mep-rate", type=float, default=1200.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added to every stand-in call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra latency per call")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability a stand-in call fails")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with this run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'stage':<16}{'rows':>10}{'seconds':>12}")
+    for n in args.sizes:
+        timings, calls = run_size(n, args)
+        for stage, seconds in timings.items():
+            results[f"{stage}@{n}"] = seconds
+            print(f"{stage:<16}{n:>10,}{seconds:>12.4f}")
+        print(f"{'upstream calls':<16}{n:>10,}  " + ", ".join(f"{k}={v}" for k, v in calls.items()))
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline found; run with --save-baseline to record one.")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f).get("results", {})
+    regressions = compare(results, baseline, args.tolerance)
+    if not regressions:
+        print(f"\nNo regressions vs {args.baseline} (tolerance {args.tolerance:.0%}).")
+        return 0
+    print(f"\nRegressions vs {args.baseline}:")
+    for key, base, current in regressions:
+        print(f"  {key:<28}{base:>10.4f}s -> {current:.4f}s ({current / base - 1:+.0%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
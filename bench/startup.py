@@ -0,0 +1,101 @@
+"""
+Cold-start benchmark based on ``python -X importtime``.
+
+Each scenario runs in a fresh interpreter so nothing is cached in sys.modules:
+
+    python -m bench.startup                  # default scenarios, top 15 imports each
+    python -m bench.startup --top 30 --repeat 5 --json startup.json
+
+"app" measures what every Streamlit cold start pays before main() runs; the
+"+ providers" scenarios show what is deferred until a page actually needs it.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "app": "import app",
+    "app + storage": "import app, database, gspread, oauth2client.service_account",
+    "app + providers": "import app, market_data; market_data._yf()",
+    "cli": "import portfolio.cli",
+}
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr):
+    """Return [{"module", "self_us", "cumulative_us", "depth"}] from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append({
+                "module": m.group(4),
+                "self_us": int(m.group(1)),
+                "cumulative_us": int(m.group(2)),
+                "depth": (len(m.group(3)) - 1) // 2,
+            })
+    return rows
+
+
+def run_scenario(code, repeat=3):
+    """Run code in fresh interpreters; returns wall times and the import tree of the last run"""
+    wall = []
+    rows = []
+    error = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        wall.append(time.perf_counter() - start)
+        rows = parse_importtime(proc.stderr)
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+            break
+    return {
+        "wall_s": statistics.median(wall),
+        "import_s": sum(r["self_us"] for r in rows) / 1e6,
+        "modules": len(rows),
+        # Direct imports of the scenario's modules are where the deferrable cost shows up
+        "top": sorted((r for r in rows if r["depth"] <= 1), key=lambda r: r["cumulative_us"], reverse=True),
+        "error": error,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="Run only these scenarios")
+    parser.add_argument("--top", type=int, default=15, help="Heaviest imports to list per scenario")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per scenario (median wall time)")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = {}
+    for name in args.scenario or list(SCENARIOS):
+        result = run_scenario(SCENARIOS[name], repeat=args.repeat)
+        report[name] = {**result, "top": result["top"][:args.top]}
+
+        print(f"\n== {name}: {result['wall_s'] * 1000:,.0f} ms wall, "
+              f"{result['import_s'] * 1000:,.0f} ms importing {result['modules']} modules")
+        if result["error"]:
+            print(f"   failed: {result['error']}")
+        for r in report[name]["top"]:
+            print(f"   {r['cumulative_us'] / 1000:9,.1f} ms  {'  ' * r['depth']}{r['module']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Synthetic ledgers in the Investments worksheet schema."""
+import numpy as np
+import pandas as pd
+
+LEDGER_COLUMNS = [
+    "Date", "Ticker", "Platform", "Quantity", "Price",
+    "Currency", "Commission", "Commission_Type", "Commission_Currency", "Total_Cost"
+]
+
+DEFAULT_PLATFORMS = ["Binance", "Interactive Brokers", "Coinbase", "IOL", "Balanz"]
+DEFAULT_CURRENCIES = ["USD", "USDT", "ARS"]
+
+
+def make_ticker_config(n_tickers, crypto_share=0.5):
+    """
+    Return {ticker: source} for n synthetic tickers.
+    Crypto tickers (CRxxx) use "Binance API"; the rest (ARxxx) use "Argentina (BYMA)".
+    """
+    n_crypto = int(round(n_tickers * crypto_share))
+    config = {f"CR{i:03d}": "Binance API" for i in range(n_crypto)}
+    config.update({f"AR{i:03d}": "Argentina (BYMA)" for i in range(n_tickers - n_crypto)})
+    return config
+
+
+def base_prices(tickers, seed=0):
+    """Deterministic USD reference price per ticker (log-uniform between 0.1 and 50k)"""
+    rng = np.random.default_rng(seed)
+    return dict(zip(tickers, np.exp(rng.uniform(np.log(0.1), np.log(50_000), len(tickers)))))
+
+
+def generate_ledger(n_transactions, tickers=None, platforms=None, currencies=None,
+                    start="2019-01-01", end=None, mep_rate=1200.0, seed=0):
+    """
+    Generate a ledger DataFrame with n_transactions rows, sorted by date.
+
+    tickers defaults to make_ticker_config(20); it may be a list or a {ticker: source}
+    mapping. ARS rows are priced at reference price * mep_rate.
+    """
+    rng = np.random.default_rng(seed)
+    tickers = list(tickers or make_ticker_config(20))
+    platforms = list(platforms or DEFAULT_PLATFORMS)
+    currencies = list(currencies or DEFAULT_CURRENCIES)
+    end = pd.Timestamp(end) if end else pd.Timestamp.today().normalize()
+    start = pd.Timestamp(start)
+
+    span_days = max((end - start).days, 1)
+    dates = start + pd.to_timedelta(np.sort(rng.integers(0, span_days + 1, n_transactions)), unit="D")
+
+    ticker_idx = rng.integers(0, len(tickers), n_transactions)
+    ref_by_ticker = base_prices(tickers, seed)
+    ref = np.array([ref_by_ticker[t] for t in tickers])[ticker_idx]
+    # +/- 40% noise around the reference price so lots have different costs
+    price_usd = ref * rng.uniform(0.6, 1.4, n_transactions)
+    quantity = np.round(rng.lognormal(mean=0.0, sigma=1.0, size=n_transactions) * 1000 / ref, 8)
+
+    currency = np.array(currencies, dtype=object)[rng.integers(0, len(currencies), n_transactions)]
+    price = np.where(currency == "ARS", price_usd * mep_rate, price_usd)
+
+    commission = np.round(rng.choice([0.1, 0.25, 0.5, 1.0], n_transactions), 4)
+    base_cost = quantity * price
+    total_cost = base_cost * (1 + commission / 100)
+
+    return pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%d"),
+        "Ticker": np.array(tickers, dtype=object)[ticker_idx],
+        "Platform": np.array(platforms, dtype=object)[rng.integers(0, len(platforms), n_transactions)],
+        "Quantity": quantity,
+        "Price": np.round(price, 6),
+        "Currency": currency,
+        "Commission": commission,
+        "Commission_Type": "Percentage",
+        "Commission_Currency": "USD",
+        "Total_Cost": np.round(total_cost, 6),
+    }, columns=LEDGER_COLUMNS)
@@ -0,0 +1 @@
+"""Root conftest: its presence puts the repository root on sys.path, so bare `pytest` can import the app modules."""
@@ -1,13 +1,37 @@
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import time
+
 import pandas as pd
-import streamlit as st
+import perf
 import utils
 
 SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
 
+INVESTMENT_COLUMNS = ["Date", "Ticker", "Platform", "Quantity", "Price",
+                      "Currency", "Commission", "Commission_Type", "Commission_Currency", "Total_Cost"]
+
+# Time partitioning: closed years live in "Investments_<year>" worksheets and are
+# summarized (per Platform/Ticker/Currency) in the summary sheet.
+ARCHIVE_PREFIX = "Investments_"
+SUMMARY_SHEET = "Ledger Summary"
+SUMMARY_COLUMNS = ["Period", "Platform", "Ticker", "Currency", "Quantity", "Total_Cost", "Transactions", "Last_Date"]
+CARRY_FORWARD = "Carry-forward" # Commission_Type marking summary rows returned by load_data
+
+# Archived partitions are closed, so each one is read once per process and reused
+# (e.g. by every render of a 1Y chart); archive_period drops the year it rewrites.
+_partition_cache = {}
+
+QUOTA_RETRIES = 3   # append_rows retries after a 429 quota error
+QUOTA_BACKOFF = 5.0 # Seconds before the first retry; doubles on each attempt
+
+class DatabaseError(Exception):
+    """Raised when Google Sheets can't be reached or updated. The UI decides how to show it."""
+
+@perf.timed("sheets.connect")
 def get_db_connection():
     """Connect to Google Sheets using st.secrets or local credentials.json"""
+    # Imported here so pages/commands that never touch the sheet don't pay for them
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
     try:
         # Check if running on Streamlit Cloud (or if secrets are set locally in .streamlit/secrets.toml)
         creds_dict = utils.get_secret("gcp_service_account")
@@ -26,11 +50,12 @@ def get_db_connection():
         sh = client.open(sheet_name)
         return sh
     except Exception as e:
-        st.error(f"Database Connection Error: {e}")
-        st.stop()
+        raise DatabaseError(f"Database Connection Error: {e}") from e
 
+@perf.timed("sheets.init_worksheets")
 def init_worksheets(sh):
     """Ensure required worksheets exist"""
+    import gspread
     try:
         # Investments Sheet
         try:
@@ -67,42 +92,183 @@ def init_worksheets(sh):
 
         return ws_inv, ws_settings
     except Exception as e:
-        st.error(f"Sheet Initialization Error: {e}")
-        st.stop()
+        raise DatabaseError(f"Sheet Initialization Error: {e}") from e
 
-def load_data():
-    sh = get_db_connection()
-    ws_inv, _ = init_worksheets(sh)
+def _read_ledger_sheet(ws, sheet_name):
+    """Read a ledger-shaped worksheet (Investments or an archived partition) into a DataFrame"""
     # Use UNFORMATTED_VALUE to get raw numbers (floats) instead of formatted strings
     # This avoids locale issues where "3,000" might be parsed as 3000 instead of 3.0
-    data = ws_inv.get_all_records(value_render_option='UNFORMATTED_VALUE')
+    with perf.span("sheets.get_all_records", sheet=sheet_name):
+        data = ws.get_all_records(value_render_option='UNFORMATTED_VALUE')
     if data:
-        df = pd.DataFrame(data)
-        # Ensure all expected columns exist
-        expected_cols = ["Date", "Ticker", "Platform", "Quantity", "Price", 
-                         "Currency", "Commission", "Commission_Type", "Commission_Currency", "Total_Cost"]
-        for col in expected_cols:
-            if col not in df.columns:
-                df[col] = "" # Default to empty string for missing cols
-        
-        # Enforce numeric types using safe_float
-        numeric_cols = ["Quantity", "Price", "Commission", "Total_Cost"]
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = df[col].apply(utils.safe_float)
+        with perf.span("compute.parse_ledger", rows=len(data)):
+            df = pd.DataFrame(data)
+            # Ensure all expected columns exist
+            for col in INVESTMENT_COLUMNS:
+                if col not in df.columns:
+                    df[col] = "" # Default to empty string for missing cols
+            
+            # Enforce numeric types using safe_float
+            numeric_cols = ["Quantity", "Price", "Commission", "Total_Cost"]
+            for col in numeric_cols:
+                if col in df.columns:
+                    df[col] = df[col].apply(utils.safe_float)
         return df
     else:
-        return pd.DataFrame(columns=[
-            "Date", "Ticker", "Platform", "Quantity", "Price", 
-            "Currency", "Commission", "Commission_Type", "Commission_Currency", "Total_Cost"
-        ])
+        return pd.DataFrame(columns=INVESTMENT_COLUMNS)
+
+def archive_title(year):
+    return f"{ARCHIVE_PREFIX}{year}"
+
+def list_archived_periods(sh):
+    """Years that have been moved out of the open Investments sheet"""
+    years = []
+    for ws in sh.worksheets():
+        suffix = ws.title[len(ARCHIVE_PREFIX):] if ws.title.startswith(ARCHIVE_PREFIX) else ""
+        if suffix.isdigit():
+            years.append(int(suffix))
+    return sorted(years)
+
+def _read_partition(sh, year):
+    """Read the archived partition of year, cached per spreadsheet and year"""
+    key = (getattr(sh, "id", None), year)
+    if key in _partition_cache:
+        perf.count("ledger.partition_hit")
+        return _partition_cache[key].copy()
+    perf.count("ledger.partition_miss")
+    df = _read_ledger_sheet(sh.worksheet(archive_title(year)), archive_title(year))
+    _partition_cache[key] = df
+    return df.copy()
+
+def _load_summary(sh):
+    try:
+        ws = sh.worksheet(SUMMARY_SHEET)
+    except Exception:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    with perf.span("sheets.get_all_records", sheet=SUMMARY_SHEET):
+        records = ws.get_all_records(value_render_option='UNFORMATTED_VALUE')
+    df = pd.DataFrame(records, columns=SUMMARY_COLUMNS) if records else pd.DataFrame(columns=SUMMARY_COLUMNS)
+    for col in ["Period", "Quantity", "Total_Cost", "Transactions"]:
+        df[col] = df[col].apply(utils.safe_float)
+    df["Period"] = df["Period"].astype(int)
+    return df
+
+def carry_forward_rows(summary, periods):
+    """
+    Collapse the summary rows of the given periods into one ledger row per
+    Platform/Ticker/Currency, dated at the end of the last period and marked
+    with Commission_Type = CARRY_FORWARD.
+    """
+    summary = summary[summary["Period"].isin(periods)]
+    if summary.empty:
+        return pd.DataFrame(columns=INVESTMENT_COLUMNS)
+    grouped = summary.groupby(["Platform", "Ticker", "Currency"], as_index=False)[["Quantity", "Total_Cost"]].sum()
+    quantity = grouped["Quantity"].where(grouped["Quantity"] != 0)
+    return pd.DataFrame({
+        "Date": f"{max(periods)}-12-31",
+        "Ticker": grouped["Ticker"],
+        "Platform": grouped["Platform"],
+        "Quantity": grouped["Quantity"],
+        "Price": (grouped["Total_Cost"] / quantity).fillna(0.0),
+        "Currency": grouped["Currency"],
+        "Commission": 0.0,
+        "Commission_Type": CARRY_FORWARD,
+        "Commission_Currency": "",
+        "Total_Cost": grouped["Total_Cost"],
+    }, columns=INVESTMENT_COLUMNS)
+
+def load_data(since=None):
+    """
+    Load the ledger: the open Investments sheet plus archived periods.
+
+    Archived (closed) years are represented by their compact carry-forward rows,
+    so a normal load reads the summary and the open period only. Pass since (a
+    date) to read the partitions of that year onwards in full, e.g. for a chart
+    range; datetime.date.min loads every transaction.
+    """
+    sh = get_db_connection()
+    ws_inv, _ = init_worksheets(sh)
+
+    frames = []
+    archived = list_archived_periods(sh)
+    if archived:
+        summarized = [y for y in archived if since is None or y < since.year]
+        if summarized:
+            frames.append(carry_forward_rows(_load_summary(sh), summarized))
+        for year in archived:
+            if year not in summarized:
+                frames.append(_read_partition(sh, year))
+    frames.append(_read_ledger_sheet(ws_inv, "Investments"))
+
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=INVESTMENT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+def archive_period(year):
+    """
+    Move every transaction dated in year from the open Investments sheet into
+    its own "Investments_<year>" worksheet and record its carry-forward summary.
+    Only closed (past) years can be archived. Returns the number of rows moved.
+
+    The archive and summary are written before the open sheet is rewritten, so
+    an interruption can leave rows duplicated but never lost.
+    """
+    import datetime
+    if year >= datetime.date.today().year:
+        raise DatabaseError(f"{year} is still open; only past years can be archived.")
+
+    sh = get_db_connection()
+    ws_inv, _ = init_worksheets(sh)
+    df = _read_ledger_sheet(ws_inv, "Investments")
+    years = pd.to_datetime(df["Date"], errors="coerce", format="mixed").dt.year
+    moving = df[years == year]
+    if moving.empty:
+        return 0
+
+    try:
+        title = archive_title(year)
+        try:
+            ws_arch = sh.worksheet(title)
+        except Exception:
+            ws_arch = sh.add_worksheet(title=title, rows=max(len(moving) + 10, 100), cols=len(INVESTMENT_COLUMNS))
+            ws_arch.append_row(INVESTMENT_COLUMNS)
+        _partition_cache.pop((getattr(sh, "id", None), year), None)
+        append_investments(moving, ws_inv=ws_arch)
+
+        # Rebuild this period's summary from the whole partition (it may have been archived before)
+        partition = _read_ledger_sheet(ws_arch, title)
+        period_summary = partition.groupby(["Platform", "Ticker", "Currency"], as_index=False).agg(
+            Quantity=("Quantity", "sum"), Total_Cost=("Total_Cost", "sum"),
+            Transactions=("Quantity", "size"), Last_Date=("Date", "max"),
+        )
+        period_summary.insert(0, "Period", year)
+        summary = _load_summary(sh)
+        summary = pd.concat([summary[summary["Period"] != year], period_summary], ignore_index=True)
+        summary = summary.sort_values(["Period", "Platform", "Ticker"])[SUMMARY_COLUMNS]
+
+        try:
+            ws_sum = sh.worksheet(SUMMARY_SHEET)
+        except Exception:
+            ws_sum = sh.add_worksheet(title=SUMMARY_SHEET, rows=1000, cols=len(SUMMARY_COLUMNS))
+        with perf.span("sheets.write", sheet=SUMMARY_SHEET, rows=len(summary)):
+            ws_sum.clear()
+            ws_sum.append_row(SUMMARY_COLUMNS)
+            ws_sum.append_rows(summary.fillna("").astype({"Last_Date": str}).values.tolist())
+    except DatabaseError:
+        raise
+    except Exception as e:
+        raise DatabaseError(f"Error archiving {year}: {e}") from e
+
+    save_data(df[years != year])
+    return len(moving)
 
 def save_data(df):
     sh = get_db_connection()
     ws_inv, _ = init_worksheets(sh)
     
-    # Prepare data for saving
-    df_tosave = df.copy()
+    # Prepare data for saving (carry-forward rows stand in for archived periods and are never written back)
+    df_tosave = df[df["Commission_Type"] != CARRY_FORWARD].copy() if "Commission_Type" in df.columns else df.copy()
     
     # Convert Date objects to string (JSON serializable)
     if "Date" in df_tosave.columns:
@@ -112,9 +278,53 @@ def save_data(df):
     df_tosave = df_tosave.fillna("")
 
     # Clear and rewrite (simple but inefficient for huge data, fine for personal app)
-    ws_inv.clear()
-    ws_inv.append_row(df_tosave.columns.tolist())
-    ws_inv.append_rows(df_tosave.values.tolist())
+    with perf.span("sheets.write", sheet="Investments", rows=len(df_tosave)):
+        ws_inv.clear()
+        ws_inv.append_row(df_tosave.columns.tolist())
+        ws_inv.append_rows(df_tosave.values.tolist())
+
+def get_investments_worksheet():
+    """Open the Investments worksheet once so callers can append several batches"""
+    sh = get_db_connection()
+    ws_inv, _ = init_worksheets(sh)
+    return ws_inv
+
+def _is_quota_error(e):
+    """True for a Sheets 429 (write quota exceeded) response"""
+    response = getattr(e, "response", None)
+    return getattr(response, "status_code", None) == 429 or getattr(e, "code", None) == 429
+
+def append_investments(df, ws_inv=None, batch_size=500, progress=None):
+    """
+    Append rows to the Investments sheet without rewriting it.
+    Rows are sent in batches of batch_size (one append_rows call each);
+    progress(rows_written) is called after every batch. Returns rows written.
+    """
+    if df.empty:
+        return 0
+    ws_inv = ws_inv or get_investments_worksheet()
+
+    df_tosave = df.reindex(columns=INVESTMENT_COLUMNS).copy()
+    df_tosave["Date"] = df_tosave["Date"].astype(str)
+    rows = df_tosave.fillna("").values.tolist()
+
+    written = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        for attempt in range(QUOTA_RETRIES + 1):
+            try:
+                with perf.span("sheets.append_rows", sheet="Investments", rows=len(batch)):
+                    ws_inv.append_rows(batch)
+                break
+            except Exception as e:
+                if _is_quota_error(e) and attempt < QUOTA_RETRIES:
+                    time.sleep(QUOTA_BACKOFF * 2 ** attempt)
+                    continue
+                raise DatabaseError(f"Error appending investments after {written} rows: {e}") from e
+        written += len(batch)
+        if progress:
+            progress(written)
+    return written
 
 def load_settings():
     # 1. API Keys -> Load from st.secrets (Read-only security)
@@ -130,7 +340,8 @@ def load_settings():
     # Load Ticker Config from Sheet
     sh = get_db_connection()
     _, ws_settings = init_worksheets(sh)
-    records = ws_settings.get_all_records()
+    with perf.span("sheets.get_all_records", sheet="Settings"):
+        records = ws_settings.get_all_records()
     
     config = {}
     for r in records:
@@ -152,16 +363,18 @@ def save_settings(settings):
     
     df_config = pd.DataFrame(config_data)
     
-    ws_settings.clear()
-    ws_settings.append_row(["Ticker", "Data Source"])
-    if not df_config.empty:
-        ws_settings.append_rows(df_config.values.tolist())
+    with perf.span("sheets.write", sheet="Settings", rows=len(df_config)):
+        ws_settings.clear()
+        ws_settings.append_row(["Ticker", "Data Source"])
+        if not df_config.empty:
+            ws_settings.append_rows(df_config.values.tolist())
 
 def load_platforms():
     sh = get_db_connection()
     try:
         ws = sh.worksheet("Platforms")
-        records = ws.get_all_records()
+        with perf.span("sheets.get_all_records", sheet="Platforms"):
+            records = ws.get_all_records()
         if not records:
              return pd.DataFrame(columns=["Platform", "Entry Commission", "Entry Type", "Exit Commission", "Exit Type", "Commission Currency"])
         df = pd.DataFrame(records)
@@ -176,9 +389,10 @@ def save_platforms(df):
     sh = get_db_connection()
     try:
         ws = sh.worksheet("Platforms")
-        ws.clear()
-        ws.append_row(df.columns.tolist())
-        if not df.empty:
-            ws.append_rows(df.values.tolist())
+        with perf.span("sheets.write", sheet="Platforms", rows=len(df)):
+            ws.clear()
+            ws.append_row(df.columns.tolist())
+            if not df.empty:
+                ws.append_rows(df.values.tolist())
     except Exception as e:
-        st.error(f"Error saving platforms: {e}")
+        raise DatabaseError(f"Error saving platforms: {e}") from e
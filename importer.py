@@ -0,0 +1,268 @@
+"""
+Bulk CSV import of broker/exchange trades into the Investments sheet.
+
+Files are parsed in chunks (pandas chunksize) so memory stays bounded by the
+chunk size, commissions are applied with the Platforms configuration in a
+vectorized way, rows already in the ledger are skipped by a hash key counted per
+occurrence (so identical fills are kept) and new rows are appended in batches instead of rewriting the whole sheet.
+"""
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+import database as db
+import perf
+
+BINANCE = "Binance trade history"
+IBKR = "Interactive Brokers (Flex trades)"
+GENERIC = "Generic (mapped columns)"
+FORMATS = [BINANCE, IBKR, GENERIC]
+
+# Ledger fields a generic file must provide (Currency and Platform may be constant)
+GENERIC_FIELDS = ["Date", "Ticker", "Quantity", "Price", "Currency", "Platform", "Side"]
+REQUIRED_GENERIC_FIELDS = ["Date", "Ticker", "Quantity", "Price"]
+
+KEY_COLUMNS = ["Date", "Ticker", "Platform", "Quantity", "Price", "Currency"]
+
+_AMOUNT_WITH_ASSET = re.compile(r"^\s*([-+]?[\d.,]+)\s*([A-Za-z0-9]*)\s*$")
+
+
+def to_float_series(s):
+    """Vectorized counterpart of utils.safe_float for a whole column"""
+    if pd.api.types.is_numeric_dtype(s):
+        return s.astype(float).fillna(0.0)
+    text = s.astype(str).str.strip()
+    values = pd.to_numeric(text.str.replace(",", "", regex=False), errors="coerce")
+    # Fall back to comma-as-decimal ("1,50") where the first attempt failed
+    values = values.fillna(pd.to_numeric(text.str.replace(",", ".", regex=False), errors="coerce"))
+    return values.fillna(0.0)
+
+
+def format_dates(s):
+    """Normalize dates to "YYYY-MM-DD" (or "YYYY-MM-DD HH:MM:SS" when a time is present)"""
+    dates = pd.to_datetime(s, errors="coerce", format="mixed")
+    text = dates.dt.strftime("%Y-%m-%d %H:%M:%S")
+    return text.str.replace(" 00:00:00", "", regex=False)
+
+
+def _split_amount(s):
+    """Split Binance values like "0.0010000000BTC" into (number, asset) columns"""
+    parts = s.astype(str).str.extract(_AMOUNT_WITH_ASSET)
+    return to_float_series(parts[0]), parts[1].fillna("").str.upper()
+
+
+def _strip_suffix(values, suffixes):
+    """values[i] without suffixes[i] (case-insensitive), or None where it doesn't end with it"""
+    return [
+        v[:-len(x)] if x and v.upper().endswith(x) else None
+        for v, x in zip(values.astype(str).str.strip(), suffixes)
+    ]
+
+
+def _normalize_binance(chunk, platform, mapping):
+    # The quote asset never starts with a digit, so splitting Amount is safe. The base asset may
+    # ("1INCH"), so take it from Pair minus the quote asset and strip that known suffix from Executed.
+    _, quote = _split_amount(chunk["Amount"])
+    pair = chunk["Pair"].astype(str).str.strip().str.upper()
+    base = pd.Series(_strip_suffix(pair, quote), index=chunk.index)
+    executed = pd.Series(_strip_suffix(chunk["Executed"], base.fillna("")), index=chunk.index)
+    fallback_qty, fallback_ticker = _split_amount(chunk["Executed"])
+    quantity = to_float_series(executed.fillna("")).where(executed.notna(), fallback_qty)
+    ticker = base.where(executed.notna(), fallback_ticker)
+    sell = chunk["Side"].astype(str).str.upper().eq("SELL")
+    return pd.DataFrame({
+        "Date": chunk["Date(UTC)"],
+        "Ticker": ticker,
+        "Platform": platform,
+        "Quantity": quantity.where(~sell, -quantity),
+        "Price": to_float_series(chunk["Price"]),
+        "Currency": quote.replace("", "USDT"),
+    })
+
+
+def _normalize_ibkr(chunk, platform, mapping):
+    # Flex trade dates come as YYYYMMDD (optionally with ";HHMMSS"); keep the time so separate fills stay distinct
+    parts = chunk["TradeDate"].astype(str).str.strip().str.split(";", n=1)
+    day, clock = parts.str[0], parts.str[1].fillna("000000").str.strip()
+    dates = pd.to_datetime(day + clock, errors="coerce", format="%Y%m%d%H%M%S")
+    dates = dates.fillna(pd.to_datetime(day, errors="coerce", format="mixed"))
+    return pd.DataFrame({
+        "Date": dates,
+        "Ticker": chunk["Symbol"].astype(str).str.upper(),
+        "Platform": platform,
+        "Quantity": to_float_series(chunk["Quantity"]),  # Already negative for sells
+        "Price": to_float_series(chunk["TradePrice"]),
+        "Currency": chunk["CurrencyPrimary"].astype(str).str.upper(),
+    })
+
+
+def _normalize_generic(chunk, platform, mapping):
+    quantity = to_float_series(chunk[mapping["Quantity"]])
+    if mapping.get("Side"):
+        sell = chunk[mapping["Side"]].astype(str).str.strip().str.upper().isin(["SELL", "S", "VENTA"])
+        quantity = quantity.abs().where(~sell, -quantity.abs())
+    return pd.DataFrame({
+        "Date": chunk[mapping["Date"]],
+        "Ticker": chunk[mapping["Ticker"]].astype(str).str.strip().str.upper(),
+        "Platform": chunk[mapping["Platform"]].astype(str) if mapping.get("Platform") else platform,
+        "Quantity": quantity,
+        "Price": to_float_series(chunk[mapping["Price"]]),
+        "Currency": chunk[mapping["Currency"]].astype(str).str.upper() if mapping.get("Currency")
+        else mapping.get("default_currency", "USD"),
+    })
+
+
+_NORMALIZERS = {
+    BINANCE: (_normalize_binance, ["Date(UTC)", "Pair", "Side", "Price", "Executed", "Amount"]),
+    IBKR: (_normalize_ibkr, ["TradeDate", "Symbol", "Quantity", "TradePrice", "CurrencyPrimary"]),
+    GENERIC: (_normalize_generic, None),
+}
+
+
+def read_header(file):
+    """Return the column names of a CSV file without reading its body"""
+    columns = pd.read_csv(file, nrows=0).columns.tolist()
+    file.seek(0)
+    return columns
+
+
+def iter_trades(file, fmt, platform, mapping=None, chunksize=5000):
+    """
+    Yield (normalized chunk, invalid row count) for a CSV file, chunk by chunk.
+    Chunks have Date, Ticker, Platform, Quantity, Price and Currency columns.
+    """
+    normalize, usecols = _NORMALIZERS[fmt]
+    mapping = mapping or {}
+    if fmt == GENERIC:
+        missing = [f for f in REQUIRED_GENERIC_FIELDS if not mapping.get(f)]
+        if missing:
+            raise ValueError(f"Map a column for: {', '.join(missing)}")
+        usecols = sorted({mapping[f] for f in GENERIC_FIELDS if mapping.get(f)})
+
+    reader = pd.read_csv(file, chunksize=chunksize, usecols=usecols, dtype=str, skipinitialspace=True)
+    for chunk in reader:
+        with perf.span("compute.import_parse", rows=len(chunk)):
+            trades = normalize(chunk, platform, mapping)
+            trades["Date"] = format_dates(trades["Date"])
+            valid = trades["Date"].notna() & trades["Ticker"].ne("") & trades["Quantity"].ne(0) & trades["Price"].gt(0)
+        yield trades[valid].reset_index(drop=True), int((~valid).sum())
+
+
+def apply_commissions(trades, platforms_df):
+    """
+    Add Commission, Commission_Type, Commission_Currency and Total_Cost using the
+    same rules as the New Entry form: entry commission for buys, exit commission
+    for sells (negative Quantity). Sells get a negative Total_Cost (net proceeds).
+    """
+    cfg_cols = ["Entry Commission", "Entry Type", "Exit Commission", "Exit Type", "Commission Currency"]
+    if platforms_df.empty:
+        cfg = pd.DataFrame(columns=cfg_cols)
+    else:
+        cfg = platforms_df.drop_duplicates("Platform").set_index("Platform")[cfg_cols]
+    merged = trades.join(cfg, on="Platform")
+
+    sell = merged["Quantity"].lt(0).to_numpy()
+    comm_val = np.where(sell, merged["Exit Commission"], merged["Entry Commission"])
+    comm_val = pd.to_numeric(pd.Series(comm_val), errors="coerce").fillna(0.0).to_numpy()
+    comm_type = pd.Series(np.where(sell, merged["Exit Type"], merged["Entry Type"])).fillna("Percentage").to_numpy()
+    comm_curr = merged["Commission Currency"].fillna("USD").to_numpy()
+
+    price = merged["Price"].to_numpy()
+    base_cost = np.abs(merged["Quantity"].to_numpy()) * price
+    is_amount = comm_type == "Amount"
+    comm_cost = np.select(
+        [is_amount & (comm_curr == "BTC"), is_amount],
+        [comm_val * price, comm_val],
+        default=base_cost * (comm_val / 100),
+    )
+
+    out = trades.copy()
+    out["Commission"] = comm_val
+    out["Commission_Type"] = comm_type
+    out["Commission_Currency"] = comm_curr
+    out["Total_Cost"] = np.where(sell, -(base_cost - comm_cost), base_cost + comm_cost)
+    return out
+
+
+def ledger_keys(df):
+    """Stable uint64 hash per row over Date, Ticker, Platform, Quantity, Price and Currency"""
+    if df.empty:
+        return pd.Series([], dtype="uint64")
+    key = pd.DataFrame({
+        "Date": format_dates(df["Date"]).fillna(""),
+        "Ticker": df["Ticker"].astype(str).str.strip().str.upper(),
+        "Platform": df["Platform"].astype(str).str.strip(),
+        "Quantity": to_float_series(df["Quantity"]).round(8),
+        "Price": to_float_series(df["Price"]).round(8),
+        "Currency": df["Currency"].astype(str).str.strip().str.upper(),
+    })
+    return pd.util.hash_pandas_object(key, index=False)
+
+
+def import_csv(file, fmt, platform, platforms_df, existing_df, mapping=None,
+               chunksize=5000, batch_size=500, pause_seconds=1.0, dry_run=False, progress=None):
+    """
+    Stream-parse a trades CSV and append the new rows to the Investments sheet.
+
+    Rows are deduplicated by occurrence: the n-th row of the file with a given key
+    (Date, Ticker, Platform, Quantity, Price, Currency) is skipped only if
+    existing_df already has at least n rows with that key, so identical fills in
+    one file are all written and re-importing the file writes nothing. Rows are written in append_rows batches of batch_size, sleeping
+    pause_seconds between batches to stay under the Sheets write quota.
+    progress(stats) is called after every chunk and batch with the running totals.
+    A DatabaseError from a write carries the totals so far as its stats attribute;
+    re-running the same file is safe because written rows are skipped as duplicates.
+    Returns the stats dict: read, invalid, duplicates, written, batches.
+    """
+    stats = {"read": 0, "invalid": 0, "duplicates": 0, "written": 0, "batches": 0}
+    existing_counts = ledger_keys(existing_df).value_counts() if existing_df is not None else pd.Series(dtype="int64")
+    file_counts = pd.Series(dtype="int64")  # Occurrences of each key in the chunks read so far
+    ws_inv = None if dry_run else db.get_investments_worksheet()
+    pending = []
+    pending_rows = 0
+
+    def flush(limit):
+        nonlocal pending, pending_rows, ws_inv
+        while pending_rows >= limit and pending_rows > 0:
+            buffer = pd.concat(pending, ignore_index=True)
+            batch, rest = buffer.iloc[:batch_size], buffer.iloc[batch_size:]
+            if not dry_run:
+                if stats["batches"] and pause_seconds:
+                    time.sleep(pause_seconds)
+                try:
+                    db.append_investments(batch, ws_inv=ws_inv, batch_size=batch_size)
+                except db.DatabaseError as e:
+                    e.stats = dict(stats)  # Totals written before the failing batch
+                    raise
+            stats["written"] += len(batch)
+            stats["batches"] += 1
+            pending, pending_rows = ([rest] if len(rest) else []), len(rest)
+            if progress:
+                progress(dict(stats))
+
+    for trades, invalid in iter_trades(file, fmt, platform, mapping, chunksize):
+        stats["read"] += len(trades) + invalid
+        stats["invalid"] += invalid
+        if trades.empty:
+            continue
+
+        keys = ledger_keys(trades)
+        # 0-based occurrence of each key in the file vs. how many copies the ledger already has
+        occurrence = keys.groupby(keys.to_numpy()).cumcount() + keys.map(file_counts).fillna(0)
+        fresh = occurrence >= keys.map(existing_counts).fillna(0)
+        file_counts = file_counts.add(keys.value_counts(), fill_value=0)
+        stats["duplicates"] += int((~fresh).sum())
+
+        new_rows = trades[fresh.to_numpy()]
+        if not new_rows.empty:
+            with perf.span("compute.import_commissions", rows=len(new_rows)):
+                pending.append(apply_commissions(new_rows, platforms_df))
+            pending_rows += len(new_rows)
+            flush(batch_size)
+        if progress:
+            progress(dict(stats))
+
+    flush(1)
+    return stats
@@ -1,18 +1,26 @@
+import json
 import requests
-import yfinance as yf
 import pandas as pd
+import perf
+
+def _yf():
+    """Import yfinance on first use; it pulls in a large stack (lxml, curl_cffi, ...)"""
+    import yfinance
+    return yfinance
 
 def get_dolar_rates():
     """Fetch MEP and CCL rates from dolarapi.com"""
     rates = {"MEP": 0.0, "CCL": 0.0}
     try:
         # Fetch MEP
-        resp_mep = requests.get("https://dolarapi.com/v1/dolares/bolsa", timeout=5)
+        with perf.span("dolarapi.get", rate="MEP"):
+            resp_mep = requests.get("https://dolarapi.com/v1/dolares/bolsa", timeout=5)
         if resp_mep.status_code == 200:
             rates["MEP"] = resp_mep.json().get("venta", 0.0)
             
         # Fetch CCL
-        resp_ccl = requests.get("https://dolarapi.com/v1/dolares/contadoconliqui", timeout=5)
+        with perf.span("dolarapi.get", rate="CCL"):
+            resp_ccl = requests.get("https://dolarapi.com/v1/dolares/contadoconliqui", timeout=5)
         if resp_ccl.status_code == 200:
             rates["CCL"] = resp_ccl.json().get("venta", 0.0)
             
@@ -36,7 +44,8 @@ def get_market_price(ticker, source):
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
             }
             try:
-                response = requests.get(url, headers=headers, timeout=5)
+                with perf.span("binance.ticker_price", symbol=symbol):
+                    response = requests.get(url, headers=headers, timeout=5)
                 response.raise_for_status() # Raise error for non-200 codes
                 data = response.json()
                 if "price" in data:
@@ -47,8 +56,9 @@ def get_market_price(ticker, source):
                 try:
                     # Fallback to Yahoo Finance (Crypto usually ends in -USD)
                     yf_symbol = f"{ticker}-USD"
-                    stock = yf.Ticker(yf_symbol)
-                    hist = stock.history(period="1d")
+                    stock = _yf().Ticker(yf_symbol)
+                    with perf.span("yahoo.history", symbol=yf_symbol):
+                        hist = stock.history(period="1d")
                     if not hist.empty:
                         price = hist["Close"].iloc[-1]
                         currency = "USD"
@@ -59,15 +69,17 @@ def get_market_price(ticker, source):
             # Append .BA if not present
             symbol = ticker if ticker.endswith(".BA") else f"{ticker}.BA"
             try:
-                stock = yf.Ticker(symbol)
+                stock = _yf().Ticker(symbol)
                 # Fast fetch using history
-                hist = stock.history(period="1d")
+                with perf.span("yahoo.history", symbol=symbol):
+                    hist = stock.history(period="1d")
                 if not hist.empty:
                     price = hist["Close"].iloc[-1]
                     
                     # Try to detect currency using fast_info
                     try:
-                        curr = stock.fast_info.currency
+                        with perf.span("yahoo.fast_info", symbol=symbol):
+                            curr = stock.fast_info.currency
                         if curr:
                             currency = curr
                         else:
@@ -82,11 +94,36 @@ def get_market_price(ticker, source):
         
     return price, currency
 
+def get_binance_prices(tickers):
+    """
+    Fetch a REST snapshot of USDT prices for several tickers in one request.
+    Returns: {ticker: price} for the tickers Binance knows about.
+    """
+    prices = {}
+    if not tickers:
+        return prices
+    symbols = {f"{t}USDT": t for t in tickers}
+    try:
+        with perf.span("binance.ticker_price_batch", symbols=len(symbols)):
+            response = requests.get(
+                "https://api.binance.com/api/v3/ticker/price",
+                params={"symbols": json.dumps(list(symbols), separators=(",", ":"))},
+                timeout=5,
+            )
+        response.raise_for_status()
+        for item in response.json():
+            ticker = symbols.get(item.get("symbol"))
+            if ticker:
+                prices[ticker] = float(item["price"])
+    except Exception as e:
+        print(f"Binance snapshot error for {list(tickers)}: {e}")
+    return prices
+
 def get_historical_prices(tickers_with_sources, start_date):
     """
     Fetch historical prices for a list of tickers from yfinance.
     """
-    all_data = pd.DataFrame()
+    closes = {}
     
     for ticker, source in tickers_with_sources.items():
         try:
@@ -99,11 +136,16 @@ def get_historical_prices(tickers_with_sources, start_date):
             else:
                 yf_ticker = ticker
                 
-            data = yf.download(yf_ticker, start=start_date, progress=False)
+            with perf.span("yahoo.download", symbol=yf_ticker):
+                data = _yf().download(yf_ticker, start=start_date, progress=False)
             if not data.empty:
-                # Forward fill and then back fill to handle any gaps
-                all_data[ticker] = data["Close"].ffill().bfill()
+                close = data["Close"]
+                closes[ticker] = close.squeeze("columns") if isinstance(close, pd.DataFrame) else close
         except Exception as e:
             print(f"Error fetching historical for {ticker}: {e}")
-            
-    return all_data
+
+    if not closes:
+        return pd.DataFrame()
+    # Outer-join the indexes so 24/7 assets keep their weekend closes next to business-day series,
+    # then forward fill and back fill to handle any gaps
+    return pd.concat(closes, axis=1).sort_index().ffill().bfill()
@@ -0,0 +1,143 @@
+"""
+Timing spans and counters for network calls and compute stages.
+
+Each Streamlit render (or CLI run) owns a Recorder; spans and counters recorded
+while it is active are attributed to that render. Every span is also emitted as
+a one-line JSON log on the "investments.perf" logger, which is silent unless
+configure_json_logging() attaches a handler. Background threads (price refresher,
+quote stream) have no recorder, so their calls only show up in the logs.
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger("investments.perf")
+
+# Span name prefixes that correspond to upstream services
+UPSTREAM_PREFIXES = ("sheets.", "dolarapi.", "binance.", "yahoo.")
+
+_current = contextvars.ContextVar("perf_recorder", default=None)
+
+
+class Recorder:
+    """Collects spans and counters for one render"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []          # [(name, ms, error)]
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def add_span(self, name, ms, error=None):
+        with self._lock:
+            self.spans.append((name, ms, error))
+
+    def add_count(self, name, n):
+        with self._lock:
+            self.counters[name] += n
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def summary(self):
+        """Return [{"name", "calls", "errors", "total_ms", "max_ms"}] sorted by total time"""
+        rows = {}
+        with self._lock:
+            for name, ms, error in self.spans:
+                row = rows.setdefault(name, {"name": name, "calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+                row["calls"] += 1
+                row["errors"] += 1 if error else 0
+                row["total_ms"] += ms
+                row["max_ms"] = max(row["max_ms"], ms)
+        return sorted(rows.values(), key=lambda r: r["total_ms"], reverse=True)
+
+    def upstream_calls(self):
+        with self._lock:
+            return sum(1 for name, _, _ in self.spans if name.startswith(UPSTREAM_PREFIXES))
+
+
+def _log(event):
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(event, default=str))
+
+
+def start_render(name="render"):
+    """Start a new Recorder for the current thread/context and return it"""
+    recorder = Recorder(name)
+    _current.set(recorder)
+    return recorder
+
+
+def current():
+    """Return the active Recorder, or None"""
+    return _current.get()
+
+
+def finish_render(recorder):
+    """Log the render summary and detach the recorder"""
+    _log({
+        "event": "render",
+        "name": recorder.name,
+        "ms": round(recorder.elapsed_ms(), 3),
+        "upstream_calls": recorder.upstream_calls(),
+        "counters": dict(recorder.counters),
+        "spans": recorder.summary(),
+    })
+    if _current.get() is recorder:
+        _current.set(None)
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """Time a block. Extra keyword arguments are included in the JSON log line."""
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        recorder = _current.get()
+        if recorder is not None:
+            recorder.add_span(name, ms, error)
+        _log({"event": "span", "name": name, "ms": round(ms, 3), "error": error,
+              "thread": threading.current_thread().name, **attrs})
+
+
+def timed(name):
+    """Decorator form of span()"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    """Increment a counter (e.g. cache hits/misses) on the active recorder"""
+    recorder = _current.get()
+    if recorder is not None and n:
+        recorder.add_count(name, n)
+
+
+def configure_json_logging(stream=None):
+    """Emit perf events as JSON lines on stream (default stderr). Safe to call repeatedly."""
+    if any(getattr(h, "_perf_json", False) for h in logger.handlers):
+        return
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    handler._perf_json = True
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
@@ -0,0 +1,6 @@
+"""
+Headless portfolio core: valuation and history maths without Streamlit.
+
+Submodules are imported explicitly (``from portfolio import valuation``) so that
+``python -m portfolio --help`` stays fast.
+"""
@@ -0,0 +1,161 @@
+"""
+Return and risk analytics on the daily portfolio series and the transaction cash flows.
+
+Time-weighted return, volatility and drawdown use the daily series from
+history.portfolio_history (day-over-day changes in Invested Capital are treated
+as external flows). Money-weighted return (XIRR) uses the ledger cash flows plus
+the current value as a final inflow, solved for every group at once.
+"""
+import numpy as np
+import pandas as pd
+
+DAYS_PER_YEAR = 365.0  # The history series is calendar-daily (prices forward-filled over weekends)
+
+XIRR_LOW = -0.9999     # Lower bound of the XIRR search (-99.99% a year)
+XIRR_HIGH = 10.0       # Initial upper bound; widened while a group has no sign change
+XIRR_TOL = 1e-9
+XIRR_MAX_ITER = 100
+
+
+def daily_returns(history_df):
+    """
+    Flow-adjusted daily returns of the portfolio.
+    r_d = (V_d - F_d) / V_(d-1) - 1, where F_d is the change in Invested Capital on day d.
+    Days that start with no market value are dropped.
+    """
+    value = history_df["Market Value (USD)"].astype(float)
+    flows = history_df["Invested Capital (USD)"].astype(float).diff()
+    prev = value.shift(1)
+    returns = (value - flows) / prev.where(prev > 0) - 1
+    return returns.replace([np.inf, -np.inf], np.nan).dropna()
+
+
+def time_weighted_return(history_df, annualize=False):
+    """Chain-linked return of the daily series, independent of the timing of contributions"""
+    returns = daily_returns(history_df)
+    if returns.empty:
+        return 0.0
+    total = float(np.prod(1 + returns.to_numpy()) - 1)
+    if not annualize:
+        return total
+    years = len(returns) / DAYS_PER_YEAR
+    return (1 + total) ** (1 / years) - 1 if total > -1 else -1.0
+
+
+def rolling_volatility(history_df, window=30):
+    """Annualized rolling standard deviation of the daily returns"""
+    returns = daily_returns(history_df)
+    return returns.rolling(window, min_periods=max(2, window // 2)).std() * np.sqrt(DAYS_PER_YEAR)
+
+
+def drawdown(history_df):
+    """Drawdown of the time-weighted wealth index from its running peak (0 to -1)"""
+    wealth = (1 + daily_returns(history_df)).cumprod()
+    return wealth / wealth.cummax() - 1
+
+
+def max_drawdown(history_df):
+    dd = drawdown(history_df)
+    return float(dd.min()) if not dd.empty else 0.0
+
+
+def xirr(amounts, dates, groups, as_of=None):
+    """
+    Annualized money-weighted return of every group, solved together.
+
+    amounts, dates and groups are parallel arrays of cash flows (negative =
+    money paid in, positive = money taken out or current value). Each group's
+    flows are compounded to as_of (default: the latest date) and the root of
+    sum(a * (1 + r) ** t) is found with safeguarded Newton steps: a step that
+    leaves the current bracket falls back to bisection. All groups are iterated
+    together with NumPy, so the cost does not grow with a Python loop per group.
+    Returns a Series indexed by group; groups without a root are NaN.
+    """
+    codes, labels = pd.factorize(pd.Series(groups), sort=True)
+    amounts = np.asarray(amounts, dtype=float)
+    dates = pd.to_datetime(pd.Series(dates), format="mixed").dt.normalize()
+    as_of = pd.Timestamp(as_of).normalize() if as_of is not None else dates.max()
+    t = ((as_of - dates).dt.days.to_numpy() / DAYS_PER_YEAR).clip(min=0.0)
+    n = len(labels)
+    if n == 0:
+        return pd.Series(dtype=float)
+
+    scale = np.bincount(codes, weights=np.abs(amounts), minlength=n)
+    scale[scale == 0] = 1.0
+
+    def fv(rate):
+        growth = (1 + rate[codes]) ** t
+        value = np.bincount(codes, weights=amounts * growth, minlength=n)
+        slope = np.bincount(codes, weights=amounts * t * growth / (1 + rate[codes]), minlength=n)
+        return value, slope
+
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        lo = np.full(n, XIRR_LOW)
+        hi = np.full(n, XIRR_HIGH)
+        f_lo, _ = fv(lo)
+        f_hi, _ = fv(hi)
+        # Widen the upper bound for groups whose root lies above it (very short, very profitable holdings)
+        for _ in range(6):
+            widen = np.sign(f_lo) == np.sign(f_hi)
+            if not widen.any():
+                break
+            hi = np.where(widen, hi * 10, hi)
+            f_hi, _ = fv(hi)
+        solvable = (np.sign(f_lo) != np.sign(f_hi)) & np.isfinite(f_lo) & np.isfinite(f_hi)
+
+        rate = np.where(solvable, 0.1, np.nan)
+        rate = np.clip(rate, lo, hi)
+        done = ~solvable
+        for _ in range(XIRR_MAX_ITER):
+            value, slope = fv(np.where(done, 0.0, rate))
+            converged = np.abs(value) / scale < XIRR_TOL
+            done = done | converged
+            if done.all():
+                break
+            # Keep the bracket: the root lies between lo and hi
+            same_as_lo = np.sign(value) == np.sign(f_lo)
+            lo = np.where(~done & same_as_lo, rate, lo)
+            f_lo = np.where(~done & same_as_lo, value, f_lo)
+            hi = np.where(~done & ~same_as_lo, rate, hi)
+
+            newton = rate - value / slope
+            inside = np.isfinite(newton) & (newton > lo) & (newton < hi)
+            step = np.where(inside, newton, (lo + hi) / 2)
+            rate = np.where(done, rate, step)
+            done = done | ((hi - lo) < XIRR_TOL * (1 + np.abs(rate)))
+
+    return pd.Series(np.where(solvable, rate, np.nan), index=labels, name="XIRR")
+
+
+def investor_flows(df, cost_col="Total_Cost_USD"):
+    """
+    Cash flows from the investor's point of view: buys (positive cost) are
+    money paid in (negative), sells (negative cost, net proceeds) money taken out.
+    """
+    return pd.DataFrame({
+        "Date": pd.to_datetime(df["Date"], format="mixed"),
+        "Platform": df["Platform"],
+        "Ticker": df["Ticker"],
+        "Amount": -df[cost_col].astype(float),
+    })
+
+
+def xirr_by(df, valued, by=None, as_of=None, cost_col="Total_Cost_USD"):
+    """
+    XIRR per group (by = "Ticker", "Platform" or None for the whole portfolio).
+    valued is the value_holdings() frame; its Updated Value (USD) is the final
+    inflow of each group on as_of (default: today).
+    """
+    as_of = pd.Timestamp(as_of or pd.Timestamp.today()).normalize()
+    flows = investor_flows(df, cost_col)
+    terminal = pd.DataFrame({
+        "Date": as_of,
+        "Platform": valued["Platform"].to_numpy(),
+        "Ticker": valued["Ticker"].to_numpy(),
+        "Amount": valued["Updated Value (USD)"].astype(float).to_numpy(),
+    })
+    flows = pd.concat([flows, terminal], ignore_index=True)
+    flows = flows[flows["Amount"] != 0]
+    groups = flows[by] if by else np.zeros(len(flows), dtype=int)
+    result = xirr(flows["Amount"].to_numpy(), flows["Date"], groups, as_of=as_of)
+    return result if by else (float(result.iloc[0]) if len(result) else float("nan"))
@@ -0,0 +1,230 @@
+"""
+Command line interface for cron jobs and exports.
+
+    python -m portfolio refresh-prices [--output snapshots/prices.json]
+    python -m portfolio value [--prices FILE | --live] [--format csv|json] [--output FILE]
+    python -m portfolio history [--prices FILE | --live] [--format csv|json] [--output FILE]
+    python -m portfolio simulate [--paths N] [--horizon DAYS] [--method bootstrap|parametric]
+                                 [--devaluation NAME] [--workers N] [--format csv|json] [--output FILE]
+
+Heavy modules (pandas, gspread, yfinance) are only imported by the command that needs them.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+
+DEFAULT_SNAPSHOT = os.path.join("snapshots", "prices.json")
+
+
+def fetch_snapshot(ticker_config):
+    """Fetch FX rates and a quote for every non-Manual ticker"""
+    import market_data as md
+
+    quotes = {}
+    for ticker, source in ticker_config.items():
+        if not source or source == "Manual":
+            continue
+        price, currency = md.get_market_price(ticker, source)
+        if price > 0:
+            quotes[ticker] = {"price": float(price), "currency": currency, "source": source}
+    return {
+        "fetched_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "fx": md.get_dolar_rates(),
+        "quotes": quotes,
+    }
+
+
+def load_snapshot(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(data, output):
+    if output:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, default=str)
+    else:
+        json.dump(data, sys.stdout, indent=2, default=str)
+        sys.stdout.write("\n")
+
+
+def write_frame(df, fmt, output, extra=None):
+    """Write a DataFrame as CSV or JSON (records, plus any extra top-level keys)"""
+    if fmt == "json":
+        write_json({**(extra or {}), "rows": df.to_dict(orient="records")}, output)
+        return
+    if output:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    df.to_csv(output or sys.stdout, index=False)
+
+
+def _snapshot_for(args, ticker_config):
+    if args.live or not os.path.exists(args.prices):
+        return fetch_snapshot(ticker_config)
+    return load_snapshot(args.prices)
+
+
+def _usd_prices(snapshot):
+    from portfolio import valuation
+
+    mep_rate = snapshot.get("fx", {}).get("MEP", 0.0)
+    prices = {}
+    for ticker, quote in snapshot.get("quotes", {}).items():
+        price_usd = valuation.price_to_usd(quote["price"], quote["currency"], mep_rate)
+        if price_usd is not None:
+            prices[ticker] = price_usd
+    return prices
+
+
+def _load_ledger(snapshot, full=False):
+    import database as db
+    from portfolio import valuation
+
+    # Archived years come back as carry-forward rows unless the full ledger is requested
+    df = db.load_data(since=datetime.date.min if full else None)
+    df["Total_Cost_USD"] = valuation.costs_to_usd(df, snapshot.get("fx", {}).get("MEP", 0.0))
+    return df
+
+
+def cmd_refresh_prices(args):
+    import database as db
+
+    ticker_config = db.load_settings().get("ticker_config", {})
+    snapshot = fetch_snapshot(ticker_config)
+    write_json(snapshot, args.output)
+    print(f"Saved {len(snapshot['quotes'])} quotes to {args.output}", file=sys.stderr)
+    return 0
+
+
+def cmd_value(args):
+    import database as db
+    from portfolio import valuation
+
+    ticker_config = db.load_settings().get("ticker_config", {})
+    snapshot = _snapshot_for(args, ticker_config)
+    df = _load_ledger(snapshot)
+    if df.empty:
+        print("No investments found.", file=sys.stderr)
+        return 1
+
+    valued = valuation.value_holdings(valuation.group_holdings(df), _usd_prices(snapshot))
+    valued = valued[valuation.VALUATION_COLUMNS]
+    totals = valuation.portfolio_totals(valued)
+    write_frame(valued, args.format, args.output, extra={
+        "prices_fetched_at": snapshot.get("fetched_at"),
+        "totals": {k: float(v) for k, v in totals.items()},
+    })
+    print(
+        f"Total value ${totals['value']:,.2f} | cost ${totals['cost']:,.2f} | "
+        f"result ${totals['result']:+,.2f} ({totals['result_pct']:+.2%})",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def cmd_history(args):
+    import pandas as pd
+
+    import database as db
+    import market_data as md
+    from portfolio import history
+
+    ticker_config = db.load_settings().get("ticker_config", {})
+    snapshot = _snapshot_for(args, ticker_config)
+    df = _load_ledger(snapshot, full=True)
+    if df.empty:
+        print("No investments found.", file=sys.stderr)
+        return 1
+
+    min_date = pd.to_datetime(df["Date"], format="mixed").min()
+    historical_prices = md.get_historical_prices(history.history_tickers(df, ticker_config), min_date)
+    history_df = history.portfolio_history(df, historical_prices, today_prices=_usd_prices(snapshot))
+    write_frame(history_df.reset_index(), args.format, args.output)
+    return 0
+
+
+def cmd_simulate(args):
+    import pandas as pd
+
+    import database as db
+    import market_data as md
+    from portfolio import scenarios, valuation
+
+    ticker_config = db.load_settings().get("ticker_config", {})
+    snapshot = _snapshot_for(args, ticker_config)
+    df = _load_ledger(snapshot)
+    if df.empty:
+        print("No investments found.", file=sys.stderr)
+        return 1
+
+    valued = valuation.value_holdings(valuation.group_holdings(df), _usd_prices(snapshot))
+    values_usd, ars_tickers, to_fetch = scenarios.holdings_inputs(valued, ticker_config)
+    start = pd.Timestamp.today().normalize() - pd.DateOffset(years=args.lookback)
+    historical_prices = md.get_historical_prices(to_fetch, start)
+    result = scenarios.simulate(
+        values_usd, historical_prices, ars_tickers, horizon=args.horizon, n_paths=args.paths,
+        method=args.method, devaluation=args.devaluation, seed=args.seed, workers=args.workers,
+    )
+    summary = scenarios.summarize(result)
+    write_frame(result["percentiles"].reset_index(), args.format, args.output, extra={"summary": summary})
+    print(
+        f"Start ${summary['start']:,.2f} | median ${summary['P50']:,.2f} | "
+        f"P5 ${summary['P5']:,.2f} | P95 ${summary['P95']:,.2f} | P(loss) {summary['prob_loss']:.1%}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m portfolio", description="Headless portfolio valuation")
+    parser.add_argument("--json-logs", action="store_true", help="Log timing spans as JSON lines on stderr")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("refresh-prices", help="Fetch quotes and FX rates into a JSON snapshot")
+    p.add_argument("--output", default=DEFAULT_SNAPSHOT, help=f"Snapshot path (default: {DEFAULT_SNAPSHOT})")
+    p.set_defaults(func=cmd_refresh_prices)
+
+    subs = {}
+    for name, func, help_text in [
+        ("value", cmd_value, "Value current holdings"),
+        ("history", cmd_history, "Daily invested capital and market value series"),
+        ("simulate", cmd_simulate, "Monte Carlo percentiles of the portfolio value over a horizon"),
+    ]:
+        p = subs[name] = sub.add_parser(name, help=help_text)
+        p.add_argument("--prices", default=DEFAULT_SNAPSHOT, help="Price snapshot written by refresh-prices")
+        p.add_argument("--live", action="store_true", help="Fetch prices now instead of reading the snapshot")
+        p.add_argument("--format", choices=["csv", "json"], default="csv")
+        p.add_argument("--output", help="Write to this file instead of stdout")
+        p.set_defaults(func=func)
+
+    from portfolio import scenarios  # numpy only; pandas stays deferred to the command
+
+    p = subs["simulate"]
+    p.add_argument("--paths", type=int, default=10_000)
+    p.add_argument("--horizon", type=int, default=365, help="Days to simulate")
+    p.add_argument("--method", choices=["bootstrap", "parametric"], default="bootstrap")
+    p.add_argument("--devaluation", default="Historical", choices=list(scenarios.DEVALUATION_SCENARIOS),
+                   help="ARS/USD scenario for ARS-priced positions")
+    p.add_argument("--lookback", type=int, default=2, help="Years of price history to sample from")
+    p.add_argument("--workers", type=int, default=0, help="Process pool size (0 = run in-process)")
+    p.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    import perf
+
+    if args.json_logs:
+        perf.configure_json_logging()
+    recorder = perf.start_render(f"cli.{args.command}")
+    try:
+        return args.func(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        perf.finish_render(recorder)
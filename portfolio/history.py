@@ -0,0 +1,68 @@
+"""Daily invested-capital / market-value series for the Portfolio Evolution chart."""
+import datetime
+
+import pandas as pd
+
+
+def history_tickers(df, ticker_config):
+    """Return the {ticker: source} mapping to request from market_data.get_historical_prices"""
+    tickers_to_fetch = {t: ticker_config.get(t, "Manual") for t in df["Ticker"].unique()}
+    # Add ARS/USD for conversion if there are ARS assets
+    if (df["Currency"] == "ARS").any():
+        tickers_to_fetch["ARS_USD"] = "Global" # Dummy source for helper
+    return tickers_to_fetch
+
+
+def portfolio_history(df, historical_prices, today_prices=None, today=None):
+    """
+    Build the daily series of invested capital and market value.
+
+    df must have Date, Ticker, Quantity and Total_Cost_USD columns.
+    For each day, holdings are valued at the last known historical close; tickers
+    without price history fall back to their cost basis, except on today where
+    today_prices ({ticker: USD price}, default 0.0) is used.
+    Returns a DataFrame indexed by Date with "Invested Capital (USD)" and
+    "Market Value (USD)" columns.
+    """
+    today = today or datetime.date.today()
+    today_prices = today_prices or {}
+    columns = ["Invested Capital (USD)", "Market Value (USD)"]
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    tx = df[["Date", "Ticker", "Quantity", "Total_Cost_USD"]].copy()
+    # A transaction counts from the first midnight at or after its timestamp
+    tx["Date"] = pd.to_datetime(tx["Date"], format="mixed").dt.ceil("D")
+    date_range = pd.date_range(start=tx["Date"].min(), end=pd.Timestamp(today), freq="D")
+    if date_range.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Cumulative quantity and cost per ticker for every day (days x tickers)
+    cum_qty = tx.pivot_table(index="Date", columns="Ticker", values="Quantity", aggfunc="sum")
+    cum_qty = cum_qty.reindex(date_range).fillna(0.0).cumsum()
+    cum_cost = tx.pivot_table(index="Date", columns="Ticker", values="Total_Cost_USD", aggfunc="sum")
+    cum_cost = cum_cost.reindex(date_range).fillna(0.0).cumsum()
+
+    # Last known close on or before each day; NaN before a ticker's first quote
+    priced = [t for t in cum_qty.columns if t in historical_prices.columns]
+    if priced:
+        hist = historical_prices[priced].sort_index()
+        hist = hist[~hist.index.duplicated(keep="last")]
+        prices = hist.reindex(hist.index.union(date_range)).ffill().reindex(date_range)
+    else:
+        prices = pd.DataFrame(index=date_range)
+    prices = prices.reindex(columns=cum_qty.columns)
+
+    # Unpriced tickers use the session price on today only
+    is_today = date_range.date == today
+    for t in cum_qty.columns:
+        if t not in priced:
+            prices.loc[is_today, t] = today_prices.get(t, 0.0)
+
+    values = (cum_qty * prices).where(prices.notna(), cum_cost)
+    history_df = pd.DataFrame({
+        "Invested Capital (USD)": cum_cost.sum(axis=1),
+        "Market Value (USD)": values.sum(axis=1),
+    }, index=date_range)
+    history_df.index.name = "Date"
+    return history_df
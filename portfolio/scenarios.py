@@ -0,0 +1,204 @@
+"""
+Monte Carlo what-if engine for the current holdings.
+
+Daily log returns are drawn for every ticker at once, either by bootstrapping
+whole historical days (keeps the cross-ticker correlation) or from a multivariate
+normal fitted to them. ARS-priced (BYMA) positions are first converted to USD
+returns with the historical ARS_USD column; a synthetic devaluation scenario
+then divides them by its own ARS/USD (MEP) path. Paths are simulated in
+chunks of paths x days x tickers sized to max_chunk_mb, optionally spread over
+a process pool. Each chunk returns the terminal value of all its paths but the
+daily portfolio totals of only a bounded sample of them (SAMPLE_PATHS overall),
+so memory does not grow with paths x horizon.
+
+pandas is imported inside simulate() so the CLI can list DEVALUATION_SCENARIOS
+as argparse choices without paying for it.
+"""
+import numpy as np
+
+METHODS = ["bootstrap", "parametric"]
+PERCENTILES = [5, 25, 50, 75, 95]
+DAYS_PER_YEAR = 365  # Calendar days, like the history series
+SAMPLE_PATHS = 2_000  # Paths whose daily totals are kept for the per-day percentile fan
+
+# ARS/USD devaluation scenarios. "historical" keeps the devaluation already in the
+# USD returns of ARS tickers (their ARS returns minus those of the ARS_USD column,
+# Yahoo's ARS=X, a proxy for MEP); the others are annual log drift and volatility plus an optional one-off step
+# devaluation ("jump", e.g. 0.5 = +50%) happening on a random day with jump_prob.
+DEVALUATION_SCENARIOS = {
+    "Historical": {"historical": True},
+    "No devaluation": {"annual_drift": 0.0, "annual_vol": 0.0},
+    "Crawling peg (2%/month)": {"annual_drift": 12 * np.log(1.02), "annual_vol": 0.05},
+    "Band break (+50% step)": {"annual_drift": 12 * np.log(1.02), "annual_vol": 0.10, "jump": 0.5, "jump_prob": 1.0},
+}
+FX_COLUMN = "ARS_USD"
+
+
+def holdings_inputs(valued, ticker_config):
+    """
+    Return ({ticker: USD value}, ARS-priced tickers, {ticker: source} to request from
+    market_data.get_historical_prices) for a value_holdings() frame.
+    """
+    by_ticker = valued.groupby("Ticker")["Updated Value (USD)"].sum()
+    values_usd = {t: float(v) for t, v in by_ticker.items() if v != 0}
+    ars_tickers = [t for t in values_usd if ticker_config.get(t) == "Argentina (BYMA)"]
+    to_fetch = {t: ticker_config.get(t, "Manual") for t in values_usd}
+    if ars_tickers:
+        to_fetch[FX_COLUMN] = "Global"
+    return values_usd, ars_tickers, to_fetch
+
+
+def log_returns(historical_prices, tickers):
+    """
+    Calendar-daily log returns (days x tickers); tickers without history stay flat (0.0).
+    The frame from get_historical_prices follows the first ticker's index (often business
+    days), so prices are put on a daily calendar first: a simulated step is one calendar
+    day, weekends included, and weekend moves of 24/7 assets are kept.
+    """
+    prices = historical_prices.reindex(columns=tickers)
+    if prices.empty:
+        return prices
+    prices = prices.set_axis(prices.index.normalize()).sort_index().groupby(level=0).last()
+    prices = prices.asfreq("D").ffill()
+    returns = np.log(prices.where(prices > 0)).diff().iloc[1:]
+    return returns.replace([np.inf, -np.inf], np.nan).fillna(0.0)
+
+
+def _chunk_paths(n_days, n_cols, max_chunk_mb):
+    """
+    Paths per chunk so that a chunk's float64 paths x days x columns blocks fit in
+    max_chunk_mb. Two blocks are alive at once at worst (the parametric draws
+    before and after the Cholesky product; exp() runs in place), so each path
+    counts twice.
+    """
+    per_path = 2 * n_days * n_cols * 8
+    return max(1, int(max_chunk_mb * 1024 * 1024 // per_path))
+
+
+def _simulate_chunk(task):
+    """
+    Simulate one chunk and return (terminal totals of every path, daily totals
+    of the first n_sample paths). Paths are i.i.d., so the first rows are a
+    random sample. task is a plain tuple so it pickles cheaply for the process pool.
+    """
+    (seed, n_paths, n_sample, horizon, method, returns, mean, chol,
+     values, ars_mask, devaluation) = task
+    rng = np.random.default_rng(seed)
+    n_cols = returns.shape[1]
+
+    # USD log return draws: paths x days x tickers
+    if method == "bootstrap":
+        draws = returns[rng.integers(0, len(returns), size=(n_paths, horizon))]
+    else:
+        draws = rng.standard_normal((n_paths, horizon, n_cols)) @ chol.T
+        draws += mean
+    np.cumsum(draws, axis=1, out=draws)
+
+    fx_log = None
+    if ars_mask.any() and not devaluation.get("historical"):
+        drift = devaluation.get("annual_drift", 0.0) / DAYS_PER_YEAR
+        vol = devaluation.get("annual_vol", 0.0) / np.sqrt(DAYS_PER_YEAR)
+        fx_log = np.cumsum(drift + vol * rng.standard_normal((n_paths, horizon)), axis=1)
+        jump = devaluation.get("jump", 0.0)
+        if jump:
+            hit = rng.random(n_paths) < devaluation.get("jump_prob", 0.0)
+            day = rng.integers(0, horizon, size=n_paths)
+            fx_log += np.log1p(jump) * (hit[:, None] & (np.arange(horizon)[None, :] >= day[:, None]))
+
+    growth = np.exp(draws, out=draws)
+
+    # USD value, with ARS-priced positions also divided by the scenario's FX move
+    if fx_log is None:
+        totals = growth @ values
+    else:
+        totals = growth @ (values * ~ars_mask)
+        totals += (growth @ (values * ars_mask)) * np.exp(-fx_log)
+    return totals[:, -1].copy(), totals[:n_sample].copy()
+
+
+def simulate(values_usd, historical_prices, ars_tickers=(), horizon=DAYS_PER_YEAR, n_paths=10_000,
+             method="bootstrap", devaluation="Historical", seed=0, workers=0, max_chunk_mb=64):
+    """
+    Simulate the USD value of the holdings over horizon days.
+
+    values_usd is {ticker: current USD value}; ars_tickers are priced in ARS, so
+    their returns are converted to USD with the FX_COLUMN of historical_prices
+    and they are exposed to the devaluation scenario (a name from
+    DEVALUATION_SCENARIOS or a dict with the same keys). With workers > 1 chunks
+    run in a ProcessPoolExecutor; results do not depend on workers, because
+    every chunk has its own seed.
+    Returns {"start_value", "terminal" (every path's final total), "sample"
+    (daily totals of about SAMPLE_PATHS paths, sample x days), "percentiles"
+    (DataFrame of the sample indexed by day 1..horizon, one column per
+    PERCENTILES entry)}.
+    """
+    import pandas as pd
+
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    if isinstance(devaluation, str):
+        devaluation = DEVALUATION_SCENARIOS[devaluation]
+
+    tickers = list(values_usd)
+    values = np.array([values_usd[t] for t in tickers], dtype=float)
+    ars_tickers = set(ars_tickers)
+    ars_mask = np.array([t in ars_tickers for t in tickers], dtype=bool)
+
+    returns = log_returns(historical_prices, tickers + ([FX_COLUMN] if ars_mask.any() else []))
+    if ars_mask.any():
+        ars_columns = [t for t in tickers if t in ars_tickers]
+        returns[ars_columns] = returns[ars_columns].sub(returns[FX_COLUMN], axis=0)
+    returns = returns.reindex(columns=tickers)
+    if returns.empty:
+        returns = pd.DataFrame(np.zeros((1, len(tickers))), columns=tickers)
+    matrix = returns.to_numpy()
+    mean = matrix.mean(axis=0)
+    chol = None
+    if method == "parametric":
+        cov = np.atleast_2d(np.cov(matrix, rowvar=False)) if len(matrix) > 1 else np.zeros((len(tickers),) * 2)
+        # Clip tiny negative eigenvalues so the factorization works for flat or collinear series
+        eigval, eigvec = np.linalg.eigh(cov)
+        chol = eigvec * np.sqrt(np.clip(eigval, 0.0, None))
+
+    chunk = _chunk_paths(horizon, len(tickers), max_chunk_mb)
+    sizes = [min(chunk, n_paths - start) for start in range(0, n_paths, chunk)]
+    # Every chunk contributes to the sample in proportion to its size
+    share = min(1.0, SAMPLE_PATHS / n_paths) if n_paths else 0.0
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [
+        (s, size, int(np.ceil(size * share)), horizon, method, matrix, mean, chol,
+         values, ars_mask, devaluation)
+        for s, size in zip(seeds, sizes)
+    ]
+
+    if workers and workers > 1 and len(tasks) > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # spawn, not fork: the Streamlit server runs the refresher and quote-stream threads (with locks)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            parts = list(pool.map(_simulate_chunk, tasks))
+    else:
+        parts = [_simulate_chunk(task) for task in tasks]
+
+    terminal = np.concatenate([t for t, _ in parts]) if parts else np.zeros(0)
+    sample = np.concatenate([s for _, s in parts]) if parts else np.zeros((0, horizon))
+    percentiles = pd.DataFrame(
+        np.percentile(sample, PERCENTILES, axis=0).T if len(sample) else np.zeros((horizon, len(PERCENTILES))),
+        index=pd.RangeIndex(1, horizon + 1, name="Day"),
+        columns=[f"P{p}" for p in PERCENTILES],
+    )
+    return {"start_value": float(values.sum()), "terminal": terminal, "sample": sample, "percentiles": percentiles}
+
+
+def summarize(result):
+    """Terminal-value statistics over every path: percentiles, mean, probability of loss and 95% VaR (USD)"""
+    start = result["start_value"]
+    terminal = result["terminal"] if len(result["terminal"]) else np.array([start])
+    summary = {f"P{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(terminal, PERCENTILES))}
+    summary.update({
+        "start": start,
+        "mean": float(terminal.mean()),
+        "prob_loss": float((terminal < start).mean()),
+        "var_95": float(max(start - np.percentile(terminal, 5), 0.0)),
+    })
+    return summary
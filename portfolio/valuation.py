@@ -0,0 +1,59 @@
+"""Portfolio valuation maths shared by the Streamlit app and the CLI (no Streamlit imports)."""
+
+VALUATION_COLUMNS = [
+    "Platform", "Ticker", "Quantity", "Total_Cost", "Avg Buy Price",
+    "Current Price (USD)", "Updated Value (USD)", "Result ($)", "Result (%)"
+]
+
+
+def price_to_usd(price, currency, mep_rate):
+    """Convert a native quote to USD. Returns None when the currency can't be converted."""
+    if currency == "USD" or currency == "USDT":
+        return price
+    if currency == "ARS" and mep_rate > 0:
+        return price / mep_rate
+    return None
+
+
+def costs_to_usd(df, mep_rate):
+    """Return Total_Cost converted to USD (ARS costs are divided by the MEP rate)"""
+    if mep_rate > 0:
+        return df["Total_Cost"].where(df["Currency"] != "ARS", df["Total_Cost"] / mep_rate)
+    return df["Total_Cost"].copy()
+
+
+def group_holdings(df):
+    """
+    Group transactions by Platform and Ticker.
+    Expects a Total_Cost_USD column; returns Quantity, Total_Cost (USD) and Avg Buy Price.
+    """
+    grouped_df = df.groupby(["Platform", "Ticker"])[["Quantity", "Total_Cost_USD"]].sum().reset_index()
+    grouped_df = grouped_df.rename(columns={"Total_Cost_USD": "Total_Cost"})
+    grouped_df["Avg Buy Price"] = grouped_df["Total_Cost"] / grouped_df["Quantity"]
+    return grouped_df
+
+
+def value_holdings(grouped_df, prices_usd, cost_col="Total_Cost"):
+    """
+    Add Current Price, Updated Value, Result ($) and Result (%) columns.
+    prices_usd is a {ticker: price} mapping; Result (%) is in percentage points.
+    """
+    valued = grouped_df.copy()
+    valued["Current Price (USD)"] = valued["Ticker"].map(prices_usd).fillna(0.0).astype(float)
+    valued["Updated Value (USD)"] = valued["Quantity"] * valued["Current Price (USD)"]
+    valued["Result ($)"] = valued["Updated Value (USD)"] - valued[cost_col]
+    cost_basis = valued[cost_col].where(valued[cost_col] > 0)
+    valued["Result (%)"] = ((valued["Updated Value (USD)"] / cost_basis - 1) * 100).fillna(0.0)
+    return valued
+
+
+def portfolio_totals(valued, cost_col="Total_Cost"):
+    """Return {"value", "cost", "result", "result_pct"} for a valued holdings frame"""
+    total_value = valued["Updated Value (USD)"].sum()
+    total_cost = valued[cost_col].sum()
+    return {
+        "value": total_value,
+        "cost": total_cost,
+        "result": valued["Result ($)"].sum(),
+        "result_pct": (total_value / total_cost - 1) if total_cost > 0 else 0.0,
+    }
@@ -0,0 +1,223 @@
+import random
+import threading
+import time
+
+import market_data as md
+import perf
+
+# Seconds between refreshes for each data source. "FX" covers the dolarapi rates.
+DEFAULT_INTERVALS = {
+    "Binance API": 30,
+    "Argentina (BYMA)": 300,
+    "Stock API": 300,
+    "FX": 300,
+}
+DEFAULT_JITTER = 0.1          # +/- fraction of the interval added to each run
+DEFAULT_MAX_BACKOFF = 1800    # Upper bound for the retry delay after failures
+DEFAULT_MAX_STALENESS = 1800  # Quotes older than this are treated as missing
+DEFAULT_TICKER_RELOAD = 600   # How often the ticker list is re-read from Settings
+DEFAULT_MIN_REFRESH = 15      # Requested refreshes never run a source sooner than this after its last run
+
+_service = None
+_service_lock = threading.Lock()
+
+
+class PriceStore:
+    """Thread-safe, process-wide store of the latest quotes and FX rates"""
+
+    def __init__(self, max_staleness=DEFAULT_MAX_STALENESS):
+        self.max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._quotes = {}  # {ticker: {"price", "currency", "source", "fetched_at"}}
+        self._fx = {}      # {"MEP": rate, "CCL": rate}
+        self._fx_fetched_at = None
+
+    def put_quote(self, ticker, price, currency, source):
+        with self._lock:
+            self._quotes[ticker] = {
+                "price": price,
+                "currency": currency,
+                "source": source,
+                "fetched_at": time.time(),
+            }
+
+    def put_fx(self, rates):
+        with self._lock:
+            self._fx = dict(rates)
+            self._fx_fetched_at = time.time()
+
+    def _is_fresh(self, fetched_at, now):
+        return fetched_at is not None and now - fetched_at <= self.max_staleness
+
+    def get_quotes(self):
+        """Return a copy of all quotes that are within max_staleness"""
+        now = time.time()
+        with self._lock:
+            quotes = {
+                t: dict(q) for t, q in self._quotes.items()
+                if self._is_fresh(q["fetched_at"], now)
+            }
+            stale = len(self._quotes) - len(quotes)
+        perf.count("price_store.quote_hit", len(quotes))
+        perf.count("price_store.quote_stale", stale)
+        return quotes
+
+    def get_fx(self):
+        """Return (rates, fetched_at); rates default to 0.0 when missing or stale"""
+        now = time.time()
+        with self._lock:
+            if self._is_fresh(self._fx_fetched_at, now):
+                perf.count("price_store.fx_hit")
+                return {"MEP": 0.0, "CCL": 0.0, **self._fx}, self._fx_fetched_at
+        perf.count("price_store.fx_miss")
+        return {"MEP": 0.0, "CCL": 0.0}, None
+
+
+class PriceRefresher:
+    """
+    Background scheduler that refreshes quotes for every configured ticker.
+
+    One daemon thread serves the whole process, so upstream load depends on the
+    number of tickers and the per-source intervals, not on the number of viewers.
+    Each source is scheduled independently with jittered intervals; failed runs
+    back off exponentially up to max_backoff. FX runs first, before the ticker
+    list is read, so ARS amounts can be converted as early as possible.
+    """
+
+    def __init__(self, load_ticker_config, store=None, intervals=None,
+                 jitter=DEFAULT_JITTER, max_backoff=DEFAULT_MAX_BACKOFF,
+                 ticker_reload=DEFAULT_TICKER_RELOAD, min_refresh=DEFAULT_MIN_REFRESH):
+        self.load_ticker_config = load_ticker_config
+        self.store = store or PriceStore()
+        self.intervals = {**DEFAULT_INTERVALS, **(intervals or {})}
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.ticker_reload = ticker_reload
+        self.min_refresh = min_refresh
+
+        self._ticker_config = {}
+        self._next_ticker_reload = 0.0
+        self._next_run = {"FX": 0.0}  # {source: monotonic time}
+        self._last_run = {}   # {source: monotonic time of the last attempt}
+        self._failures = {}   # {source: consecutive failures}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="price-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def request_refresh(self, reload_tickers=False):
+        """
+        Ask for an early refresh of all sources without waiting for it.
+        A source runs no sooner than min_refresh after its last run, and a
+        source that is backing off after failures keeps its schedule.
+        """
+        if reload_tickers:
+            self._next_ticker_reload = 0.0
+        now = time.monotonic()
+        for source, due in list(self._next_run.items()):
+            if self._failures.get(source):
+                continue
+            earliest = max(now, self._last_run.get(source, -self.min_refresh) + self.min_refresh)
+            self._next_run[source] = min(due, earliest)
+        self._wake.set()
+
+    def status(self):
+        """Return {source: consecutive failures} for display"""
+        return dict(self._failures)
+
+    def _delay(self, source):
+        base = self.intervals.get(source, DEFAULT_INTERVALS["FX"])
+        failures = self._failures.get(source, 0)
+        if failures:
+            base = min(base * (2 ** failures), self.max_backoff)
+        return base * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _reload_tickers(self):
+        try:
+            config = self.load_ticker_config() or {}
+            self._ticker_config = {t: s for t, s in config.items() if s and s != "Manual"}
+        except Exception as e:
+            print(f"Price refresher: error loading ticker config: {e}")
+        self._next_ticker_reload = time.monotonic() + self.ticker_reload
+
+        # Schedule any newly seen source right away
+        for source in set(self._ticker_config.values()) | {"FX"}:
+            self._next_run.setdefault(source, 0.0)
+
+    def _refresh_source(self, source):
+        """Fetch every ticker of a source. Returns False if nothing could be fetched."""
+        if source == "FX":
+            rates = md.get_dolar_rates()
+            if rates.get("MEP", 0.0) > 0 or rates.get("CCL", 0.0) > 0:
+                self.store.put_fx(rates)
+                return True
+            return False
+
+        tickers = [t for t, s in self._ticker_config.items() if s == source]
+        if not tickers:
+            return True
+        fetched = 0
+        for ticker in tickers:
+            price, currency = md.get_market_price(ticker, source)
+            if price > 0:
+                self.store.put_quote(ticker, price, currency, source)
+                fetched += 1
+        return fetched > 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            for source, due in list(self._next_run.items()):
+                if self._stop.is_set():
+                    break
+                if time.monotonic() < due:
+                    continue
+                try:
+                    ok = self._refresh_source(source)
+                except Exception as e:
+                    print(f"Price refresher: error refreshing {source}: {e}")
+                    ok = False
+                self._failures[source] = 0 if ok else self._failures.get(source, 0) + 1
+                self._last_run[source] = time.monotonic()
+                self._next_run[source] = self._last_run[source] + self._delay(source)
+
+            # After the source runs, so the first FX fetch doesn't wait for the Settings sheet
+            if not self._stop.is_set() and time.monotonic() >= self._next_ticker_reload:
+                self._reload_tickers()
+
+            next_due = min(list(self._next_run.values()) + [self._next_ticker_reload])
+            self._wake.wait(timeout=max(0.0, next_due - time.monotonic()))
+            self._wake.clear()
+
+
+def get_service(load_ticker_config, config=None):
+    """
+    Return the process-wide PriceRefresher, creating and starting it on first use.
+    Never blocks on the network: the first FX rates arrive from the background thread.
+
+    config (optional) may contain "intervals", "jitter", "max_backoff",
+    "max_staleness", "ticker_reload" and "min_refresh" overrides.
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            config = dict(config or {})
+            store = PriceStore(max_staleness=config.get("max_staleness", DEFAULT_MAX_STALENESS))
+            _service = PriceRefresher(
+                load_ticker_config,
+                store=store,
+                intervals=config.get("intervals"),
+                jitter=config.get("jitter", DEFAULT_JITTER),
+                max_backoff=config.get("max_backoff", DEFAULT_MAX_BACKOFF),
+                ticker_reload=config.get("ticker_reload", DEFAULT_TICKER_RELOAD),
+                min_refresh=config.get("min_refresh", DEFAULT_MIN_REFRESH),
+            )
+        _service.start()
+        return _service
@@ -0,0 +1,304 @@
+import abc
+import json
+import threading
+import time
+
+import market_data as md
+
+DEFAULT_GAP_TIMEOUT = 15      # Seconds without a message before a symbol is considered stale
+DEFAULT_MAX_RECONNECT = 60    # Upper bound for the reconnect delay
+DEFAULT_IDLE_TIMEOUT = 60     # Seconds without set_tickers() calls before the stream shuts down
+
+_stream = None
+_stream_lock = threading.Lock()
+
+
+class StreamProvider(abc.ABC):
+    """
+    Interface for a push quote source.
+
+    A provider knows how to open a connection for a set of tickers, how to
+    (re)subscribe and unsubscribe on an open connection, how to parse raw
+    messages and how to take a REST snapshot when the stream has a gap.
+    bench.fakes.FakeStreamProvider is an in-process stand-in that can drop its
+    connection on demand.
+    """
+
+    @abc.abstractmethod
+    def connect(self, tickers):
+        """Open a connection already subscribed to tickers. Must return an object with recv() and close()."""
+
+    @abc.abstractmethod
+    def subscribe(self, conn, tickers):
+        """Subscribe an open connection to additional tickers"""
+
+    @abc.abstractmethod
+    def unsubscribe(self, conn, tickers):
+        """Stop receiving tickers on an open connection"""
+
+    @abc.abstractmethod
+    def parse(self, message):
+        """Return a list of (ticker, price, event_time_ms) tuples for a raw message"""
+
+    @abc.abstractmethod
+    def snapshot(self, tickers):
+        """Return {ticker: price} fetched over REST"""
+
+    def is_idle(self, exc):
+        """True if exc from recv() only means no message arrived in time"""
+        return isinstance(exc, TimeoutError)
+
+
+class BinanceStreamProvider(StreamProvider):
+    """Binance combined <symbol>usdt@miniTicker stream"""
+
+    def __init__(self, base_url="wss://stream.binance.com:9443", timeout=5):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._request_id = 0
+
+    def _stream_name(self, ticker):
+        return f"{ticker.lower()}usdt@miniTicker"
+
+    def connect(self, tickers):
+        try:
+            import websocket  # websocket-client, only needed when streaming is enabled
+        except ImportError as e:
+            raise RuntimeError("Streaming mode requires the 'websocket-client' package") from e
+        streams = "/".join(self._stream_name(t) for t in sorted(tickers))
+        return websocket.create_connection(f"{self.base_url}/stream?streams={streams}", timeout=self.timeout)
+
+    def _send(self, conn, method, tickers):
+        self._request_id += 1
+        conn.send(json.dumps({
+            "method": method,
+            "params": [self._stream_name(t) for t in sorted(tickers)],
+            "id": self._request_id,
+        }))
+
+    def subscribe(self, conn, tickers):
+        self._send(conn, "SUBSCRIBE", tickers)
+
+    def unsubscribe(self, conn, tickers):
+        self._send(conn, "UNSUBSCRIBE", tickers)
+
+    def parse(self, message):
+        payload = json.loads(message)
+        data = payload.get("data", payload)
+        # Subscription acks ({"result": null, "id": 1}) carry no quotes
+        if not isinstance(data, dict) or "s" not in data or "c" not in data:
+            return []
+        symbol = data["s"]
+        if not symbol.endswith("USDT"):
+            return []
+        return [(symbol[:-len("USDT")], float(data["c"]), data.get("E"))]
+
+    def is_idle(self, exc):
+        import websocket
+        return isinstance(exc, (TimeoutError, websocket.WebSocketTimeoutException))
+
+    def snapshot(self, tickers):
+        prices = md.get_binance_prices(tickers)
+        # The batch endpoint rejects the whole request on one unknown symbol; retry individually
+        for ticker in set(tickers) - set(prices):
+            price, _ = md.get_market_price(ticker, "Binance API")
+            if price > 0:
+                prices[ticker] = price
+        return prices
+
+
+class QuoteStream:
+    """
+    Background consumer that keeps an in-memory last-price table up to date.
+
+    The connection is re-opened with exponential backoff when it drops, and the
+    current ticker set is resubscribed. After a reconnect, or when a ticker has
+    been silent for longer than gap_timeout, a REST snapshot fills the gap.
+    Callers keep the stream alive by calling set_tickers(); once nobody has for
+    idle_timeout seconds it disconnects and its thread exits, and the next
+    set_tickers() starts it again.
+    """
+
+    def __init__(self, provider, on_price=None, gap_timeout=DEFAULT_GAP_TIMEOUT,
+                 max_reconnect=DEFAULT_MAX_RECONNECT, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.provider = provider
+        self.on_price = on_price
+        self.gap_timeout = gap_timeout
+        self.max_reconnect = max_reconnect
+        self.idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        self._prices = {}        # {ticker: {"price", "event_time", "received_at", "via"}}
+        self._tickers = set()
+        self._pending = set()    # Tickers added while connected, waiting for SUBSCRIBE
+        self._removed = set()    # Tickers dropped while connected, waiting for UNSUBSCRIBE
+        self._last_demand = time.monotonic()
+        self._conn = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.reconnects = 0
+
+    def start(self):
+        with self._lock:
+            self._last_demand = time.monotonic()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="quote-stream", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._close()
+
+    def set_tickers(self, tickers):
+        """
+        Track exactly these tickers: new ones are subscribed on the open
+        connection, dropped ones unsubscribed and their prices forgotten.
+        Also restarts the stream if it shut down while idle.
+        """
+        tickers = set(tickers)
+        with self._lock:
+            added, removed = tickers - self._tickers, self._tickers - tickers
+            self._pending = (self._pending | added) - removed
+            self._removed = (self._removed | removed) - added
+            self._tickers = tickers
+            for ticker in removed:
+                self._prices.pop(ticker, None)
+        self.start()
+
+    def last_prices(self):
+        """Return a copy of the last-price table"""
+        with self._lock:
+            return {t: dict(p) for t, p in self._prices.items()}
+
+    def is_connected(self):
+        return self._conn is not None
+
+    def _record(self, ticker, price, event_time, via):
+        with self._lock:
+            if ticker not in self._tickers:
+                return
+            self._prices[ticker] = {
+                "price": price,
+                "event_time": event_time,
+                "received_at": time.time(),
+                "via": via,
+            }
+        if self.on_price:
+            try:
+                self.on_price(ticker, price)
+            except Exception as e:
+                print(f"Quote stream: on_price callback error for {ticker}: {e}")
+
+    def _fill_gap(self, tickers):
+        if not tickers:
+            return
+        try:
+            for ticker, price in self.provider.snapshot(sorted(tickers)).items():
+                self._record(ticker, price, None, "rest")
+        except Exception as e:
+            print(f"Quote stream: snapshot error: {e}")
+
+    def _stale_tickers(self):
+        now = time.time()
+        with self._lock:
+            return {
+                t for t in self._tickers
+                if t not in self._prices or now - self._prices[t]["received_at"] > self.gap_timeout
+            }
+
+    def _close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _idle(self):
+        return time.monotonic() - self._last_demand > self.idle_timeout
+
+    def _exit_if_idle(self):
+        """Close the connection and, if still nobody wants quotes, let the thread go (True)"""
+        self._close()
+        with self._lock:
+            if not self._idle():
+                return False
+            self._thread = None
+            return True
+
+    def _run(self):
+        delay = 1
+        while not self._stop.is_set():
+            if self._idle() and self._exit_if_idle():
+                return
+            with self._lock:
+                tickers = set(self._tickers)
+                self._pending.clear()
+                self._removed.clear()
+            if not tickers:
+                self._stop.wait(1)
+                continue
+
+            try:
+                self._conn = self.provider.connect(tickers)
+            except Exception as e:
+                print(f"Quote stream: connect error: {e}. Retrying in {delay}s")
+                self._fill_gap(tickers)
+                self._stop.wait(delay)
+                delay = min(delay * 2, self.max_reconnect)
+                continue
+
+            delay = 1
+            # Whatever happened while disconnected is a gap; take a snapshot
+            self._fill_gap(tickers)
+            last_gap_check = time.monotonic()
+            emptied = False
+
+            while not self._stop.is_set():
+                with self._lock:
+                    pending, self._pending = self._pending, set()
+                    removed, self._removed = self._removed, set()
+                    emptied = not self._tickers
+                # Nothing left to watch (or nobody watching): disconnect without counting a reconnect
+                if emptied or self._idle():
+                    break
+                try:
+                    if removed:
+                        self.provider.unsubscribe(self._conn, removed)
+                    if pending:
+                        self.provider.subscribe(self._conn, pending)
+                    message = self._conn.recv()
+                except Exception as e:
+                    # Timeouts are expected on quiet markets; anything else drops the connection
+                    if self.provider.is_idle(e):
+                        message = None
+                    else:
+                        print(f"Quote stream: connection lost: {e}")
+                        break
+
+                if message:
+                    try:
+                        for ticker, price, event_time in self.provider.parse(message):
+                            self._record(ticker, price, event_time, "stream")
+                    except Exception as e:
+                        print(f"Quote stream: bad message {message!r}: {e}")
+
+                if time.monotonic() - last_gap_check >= self.gap_timeout:
+                    self._fill_gap(self._stale_tickers())
+                    last_gap_check = time.monotonic()
+
+            self._close()
+            if not self._stop.is_set() and not (emptied or self._idle()):
+                self.reconnects += 1
+                self._stop.wait(delay)
+
+
+def get_stream(provider=None, on_price=None, gap_timeout=DEFAULT_GAP_TIMEOUT, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    """Return the process-wide QuoteStream, creating and starting it on first use"""
+    global _stream
+    with _stream_lock:
+        if _stream is None:
+            _stream = QuoteStream(provider or BinanceStreamProvider(), on_price=on_price,
+                                  gap_timeout=gap_timeout, idle_timeout=idle_timeout)
+        _stream.start()
+        return _stream
@@ -0,0 +1,24 @@
+import pytest
+
+from bench.fakes import stand_ins
+from bench.synthetic import generate_ledger, make_ticker_config
+
+# Binance trade history export: timestamped rows, a base asset starting with a digit and a thousands separator
+BINANCE_CSV = """Date(UTC),Pair,Side,Price,Executed,Amount,Fee
+2024-03-05 14:22:10,1INCHUSDT,BUY,0.5,10.51INCH,5.25USDT,0.01USDT
+2024-03-05 14:22:11,ETHBTC,SELL,0.05,"1,234.5ETH",61.725BTC,0.0001BTC
+"""
+
+
+@pytest.fixture
+def binance_csv():
+    return BINANCE_CSV
+
+
+@pytest.fixture
+def sheets():
+    """Stand-in Sheets/Binance/Yahoo/dolarapi with a small date-only ledger (2024-01-01 to 2024-06-01)"""
+    ticker_config = make_ticker_config(3)
+    ledger = generate_ledger(20, tickers=ticker_config, start="2024-01-01", end="2024-06-01")
+    with stand_ins(ledger, ticker_config) as env:
+        yield {**env, "ledger": ledger, "ticker_config": ticker_config}
@@ -0,0 +1,68 @@
+"""Known answers for the return and risk analytics."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio import analytics
+
+
+def _history(values, capital):
+    index = pd.date_range("2024-01-01", periods=len(values), freq="D")
+    return pd.DataFrame({"Market Value (USD)": values, "Invested Capital (USD)": capital}, index=index)
+
+
+def test_xirr_known_answer():
+    result = analytics.xirr([-100.0, 110.0], ["2023-01-01", "2024-01-01"], ["a", "a"])
+    assert result["a"] == pytest.approx(0.10, abs=1e-9)
+
+
+def test_xirr_group_without_root_is_nan():
+    result = analytics.xirr(
+        [-100.0, 110.0, -50.0, -20.0],
+        ["2023-01-01", "2024-01-01", "2023-01-01", "2023-06-01"],
+        ["ok", "ok", "paid_in_only", "paid_in_only"],
+    )
+    assert result["ok"] == pytest.approx(0.10)
+    assert np.isnan(result["paid_in_only"])
+
+
+def test_xirr_batched_matches_scalar_bisection():
+    rng = np.random.default_rng(7)
+    n_groups, per_group = 40, 6
+    groups = np.repeat(np.arange(n_groups), per_group)
+    days = rng.integers(0, 1500, size=len(groups))
+    amounts = -rng.uniform(10, 1000, size=len(groups))
+    dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(days, unit="D")
+    as_of = pd.Timestamp("2024-12-31")
+    # One terminal inflow per group, between 0.3x and 3x what was paid in
+    paid = -np.bincount(groups, weights=amounts)
+    amounts = np.concatenate([amounts, paid * rng.uniform(0.3, 3.0, size=n_groups)])
+    dates = dates.append(pd.DatetimeIndex([as_of] * n_groups))
+    groups = np.concatenate([groups, np.arange(n_groups)])
+
+    batched = analytics.xirr(amounts, dates, groups, as_of=as_of)
+
+    t = (as_of - dates).days.to_numpy() / analytics.DAYS_PER_YEAR
+    for g in range(n_groups):
+        mask = groups == g
+        lo, hi = analytics.XIRR_LOW, analytics.XIRR_HIGH
+        fv = lambda r: np.sum(amounts[mask] * (1 + r) ** t[mask])
+        for _ in range(200):
+            mid = (lo + hi) / 2
+            lo, hi = (mid, hi) if np.sign(fv(mid)) == np.sign(fv(lo)) else (lo, mid)
+        assert batched[g] == pytest.approx(lo, abs=1e-7)
+
+
+def test_twr_is_unchanged_by_a_contribution():
+    without = _history([100.0, 110.0, 121.0], [100.0, 100.0, 100.0])
+    # Same +10% days, with 50 paid in on the second day
+    with_flow = _history([100.0, 160.0, 176.0], [100.0, 150.0, 150.0])
+    assert analytics.time_weighted_return(without) == pytest.approx(0.21)
+    assert analytics.time_weighted_return(with_flow) == pytest.approx(0.21)
+
+
+def test_drawdown_of_a_simple_series():
+    history_df = _history([100.0, 120.0, 90.0, 120.0, 60.0], [100.0] * 5)
+    dd = analytics.drawdown(history_df)
+    assert dd.tolist() == pytest.approx([0.0, -0.25, 0.0, -0.5])
+    assert analytics.max_drawdown(history_df) == pytest.approx(-0.5)
@@ -0,0 +1,46 @@
+"""Ledger time-partitioning: archiving a closed year must not change what the ledger adds up to."""
+import datetime
+
+import pandas as pd
+import pytest
+
+import database as db
+
+
+def _positions(df):
+    return df.groupby(["Platform", "Ticker"])[["Quantity", "Total_Cost"]].sum().sort_index()
+
+
+def _entry(date, ledger):
+    row = ledger.iloc[0].copy()
+    row["Date"] = date
+    return pd.DataFrame([row])
+
+
+def test_archive_round_trip(sheets):
+    ledger = sheets["ledger"]
+    db.append_investments(_entry("2025-02-01", ledger))
+    before = db.load_data()
+
+    assert db.archive_period(2024) == len(ledger)
+    assert [ws.title for ws in sheets["spreadsheet"].worksheets() if ws.title.startswith(db.ARCHIVE_PREFIX)] == ["Investments_2024"]
+
+    summarized = db.load_data()
+    assert (summarized["Commission_Type"] == db.CARRY_FORWARD).sum() == ledger[["Platform", "Ticker", "Currency"]].drop_duplicates().shape[0]
+    pd.testing.assert_frame_equal(_positions(summarized), _positions(before), check_exact=False)
+
+    full = db.load_data(since=datetime.date.min)
+    assert len(full) == len(before)
+    assert not (full["Commission_Type"] == db.CARRY_FORWARD).any()
+
+    # Archiving the same year again appends to its partition and rebuilds its summary
+    db.append_investments(_entry("2024-12-15", ledger))
+    assert db.archive_period(2024) == 1
+    assert len(db.load_data(since=datetime.date.min)) == len(before) + 1
+    after = _positions(before).add(_positions(_entry("2024-12-15", ledger)), fill_value=0)
+    pd.testing.assert_frame_equal(_positions(db.load_data()), after, check_exact=False)
+
+
+def test_open_year_cannot_be_archived(sheets):
+    with pytest.raises(db.DatabaseError):
+        db.archive_period(datetime.date.today().year)
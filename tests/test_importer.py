@@ -0,0 +1,74 @@
+import io
+
+import pandas as pd
+import pytest
+
+import database as db
+import importer
+
+
+def test_binance_base_asset_from_pair(binance_csv):
+    (trades, invalid), = importer.iter_trades(io.StringIO(binance_csv), importer.BINANCE, "Binance")
+    assert invalid == 0
+    assert trades["Ticker"].tolist() == ["1INCH", "ETH"]
+    assert trades["Quantity"].tolist() == [10.5, -1234.5]
+    assert trades["Currency"].tolist() == ["USDT", "BTC"]
+
+
+class QuotaError(Exception):
+    def __init__(self):
+        super().__init__("429: Quota exceeded")
+        self.response = type("Response", (), {"status_code": 429})()
+
+
+def _write_failures(monkeypatch, ws, fail_calls):
+    """Make the given (1-based) append_rows calls on ws raise a 429"""
+    calls = {"n": 0}
+    append_rows = ws.append_rows
+
+    def flaky(rows):
+        calls["n"] += 1
+        if calls["n"] in fail_calls:
+            raise QuotaError()
+        return append_rows(rows)
+    monkeypatch.setattr(ws, "append_rows", flaky)
+    monkeypatch.setattr(db, "QUOTA_BACKOFF", 0.0)
+
+
+def test_quota_errors_are_retried_then_reported_with_partial_stats(monkeypatch, sheets, binance_csv):
+    ws = sheets["spreadsheet"].worksheet("Investments")
+
+    _write_failures(monkeypatch, ws, fail_calls={1})
+    stats = importer.import_csv(io.StringIO(binance_csv), importer.BINANCE, "Binance", pd.DataFrame(),
+                                db.load_data(), batch_size=1, pause_seconds=0)
+    assert stats["written"] == 2
+
+    ws.rows = ws.rows[:-1]  # Drop the last imported row so a re-run has one to write
+    _write_failures(monkeypatch, ws, fail_calls=set(range(1, 10)))
+    with pytest.raises(db.DatabaseError) as excinfo:
+        importer.import_csv(io.StringIO(binance_csv), importer.BINANCE, "Binance", pd.DataFrame(),
+                            db.load_data(), batch_size=1, pause_seconds=0)
+    assert excinfo.value.stats["written"] == 0
+    assert excinfo.value.stats["duplicates"] == 1
+
+
+IBKR_CSV = """TradeDate,Symbol,Quantity,TradePrice,CurrencyPrimary
+20240305;101500,AAPL,10,170,USD
+20240305;143000,AAPL,10,170,USD
+20240306,AAPL,10,170,USD
+20240306,AAPL,10,170,USD
+"""
+
+
+def test_identical_fills_are_kept_and_reimport_writes_nothing(sheets):
+    def run():
+        return importer.import_csv(io.StringIO(IBKR_CSV), importer.IBKR, "IBKR", pd.DataFrame(),
+                                   db.load_data(), chunksize=3, pause_seconds=0)
+
+    stats = run()
+    assert (stats["written"], stats["duplicates"]) == (4, 0)
+    dates = db.load_data().query("Ticker == 'AAPL'")["Date"].tolist()
+    assert dates == ["2024-03-05 10:15:00", "2024-03-05 14:30:00", "2024-03-06", "2024-03-06"]
+
+    stats = run()
+    assert (stats["written"], stats["duplicates"]) == (0, 4)
@@ -0,0 +1,28 @@
+"""Ledgers mixing date-only rows (New Entry, carry-forward) and timestamped rows (Binance imports)."""
+import io
+
+import pandas as pd
+import pytest
+
+import database as db
+import importer
+from portfolio import analytics, history, valuation
+
+
+def test_mixed_date_formats_load_and_chart(sheets, binance_csv):
+    stats = importer.import_csv(
+        io.StringIO(binance_csv), importer.BINANCE, "Binance", db.load_platforms(),
+        db.load_data(), pause_seconds=0,
+    )
+    assert stats["written"] == 2
+
+    df = db.load_data()
+    assert df["Date"].astype(str).str.len().nunique() > 1  # Both formats are in the ledger
+    df["Total_Cost_USD"] = valuation.costs_to_usd(df, 1200.0)
+
+    history_df = history.portfolio_history(df, pd.DataFrame(), today=pd.Timestamp("2024-06-30").date())
+    assert history_df.index[-1] == pd.Timestamp("2024-06-30")
+    assert history_df["Invested Capital (USD)"].iloc[-1] == pytest.approx(df["Total_Cost_USD"].sum())
+
+    flows = analytics.investor_flows(df)
+    assert flows["Date"].notna().all()
@@ -0,0 +1,20 @@
+import time
+
+import price_service
+
+
+def test_refresh_requests_respect_min_interval_and_backoff():
+    refresher = price_service.PriceRefresher(dict, min_refresh=60)
+    now = time.monotonic()
+    refresher._next_run = {"FX": now + 300, "Stock API": now + 300, "Binance API": now + 900}
+    refresher._last_run = {"FX": now - 300, "Stock API": now - 5, "Binance API": now - 300}
+    refresher._failures = {"Binance API": 3}
+
+    refresher.request_refresh()
+    assert refresher._next_run["FX"] <= time.monotonic()            # Due now
+    assert refresher._next_run["Stock API"] >= now + 55             # Not before min_refresh since its last run
+    assert refresher._next_run["Binance API"] == now + 900          # Backoff kept
+
+    # Repeated clicks coalesce instead of moving it earlier
+    refresher.request_refresh()
+    assert refresher._next_run["Stock API"] >= now + 55
@@ -0,0 +1,74 @@
+import time
+
+from bench.fakes import FakeStreamProvider
+from quote_stream import QuoteStream
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_reconnect_resubscribes_and_fills_gaps():
+    provider = FakeStreamProvider({"BTC": 60000.0, "ETH": 3000.0})
+    pushed = []
+    stream = QuoteStream(provider, on_price=lambda t, p: pushed.append((t, p)), gap_timeout=0.3, max_reconnect=1)
+    stream.set_tickers({"BTC"})
+    stream.start()
+    try:
+        # Connecting takes a snapshot first, then stream messages win
+        assert provider.wait_connected()
+        assert _wait_for(lambda: stream.last_prices().get("BTC", {}).get("via") == "rest")
+        provider.push("BTC", 61000.0, 1)
+        assert _wait_for(lambda: stream.last_prices()["BTC"]["via"] == "stream")
+        assert stream.last_prices()["BTC"]["price"] == 61000.0
+
+        # A ticker added on an open connection is subscribed there
+        stream.set_tickers({"BTC", "ETH"})
+        assert _wait_for(lambda: {"ETH"} in provider.subscriptions)
+
+        # After a drop the stream reconnects with every ticker and snapshots the gap
+        snapshots_before = len(provider.snapshots)
+        provider.drop()
+        assert provider.wait_connected()
+        assert _wait_for(lambda: len(provider.connects) == 2)
+        assert provider.connects[-1] == {"BTC", "ETH"}
+        assert _wait_for(lambda: {"BTC", "ETH"} in provider.snapshots[snapshots_before:])
+        assert stream.reconnects == 1
+        assert stream.last_prices()["BTC"] == {**stream.last_prices()["BTC"], "price": 60000.0, "via": "rest"}
+
+        # A ticker silent for longer than gap_timeout is refreshed over REST
+        provider.push("BTC", 62000.0, 2)
+        assert _wait_for(lambda: stream.last_prices()["BTC"]["price"] == 62000.0)
+        assert _wait_for(lambda: stream.last_prices()["BTC"]["via"] == "rest", timeout=3)
+        assert ("ETH", 3000.0) in pushed
+    finally:
+        stream.stop()
+
+
+def test_removed_tickers_are_unsubscribed_and_idle_stream_shuts_down():
+    provider = FakeStreamProvider({"BTC": 60000.0, "ETH": 3000.0})
+    stream = QuoteStream(provider, gap_timeout=5, idle_timeout=0.5)
+    stream.set_tickers({"BTC", "ETH"})
+    try:
+        assert provider.wait_connected()
+        assert _wait_for(lambda: set(stream.last_prices()) == {"BTC", "ETH"})
+
+        stream.set_tickers({"BTC"})
+        assert _wait_for(lambda: {"ETH"} in provider.unsubscriptions)
+        assert set(stream.last_prices()) == {"BTC"}
+
+        # Nobody calls set_tickers any more: the stream disconnects and its thread exits
+        assert _wait_for(lambda: not stream.is_connected() and stream._thread is None, timeout=3)
+        assert stream.reconnects == 0
+
+        # The next caller starts it again
+        stream.set_tickers({"BTC"})
+        assert _wait_for(lambda: len(provider.connects) == 2)
+        assert provider.connects[-1] == {"BTC"}
+    finally:
+        stream.stop()
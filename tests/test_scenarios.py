@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from portfolio import scenarios
+
+
+def test_log_returns_are_calendar_daily():
+    business_days = pd.bdate_range("2024-01-01", periods=20)
+    calendar = pd.date_range("2024-01-01", "2024-01-31")
+    prices = pd.DataFrame({
+        "STK": np.linspace(10, 12, len(business_days)),
+    }, index=business_days).join(pd.Series(np.linspace(100, 130, len(calendar)), index=calendar, name="BTC"), how="outer")
+
+    returns = scenarios.log_returns(prices, ["STK", "BTC", "NOHIST"])
+    assert (returns.index[1:] - returns.index[:-1]).max() == pd.Timedelta(days=1)
+    # Weekend moves of the 24/7 asset are kept; the stock is flat over weekends; no history means flat
+    assert np.isclose(returns["BTC"].sum(), np.log(130 / 100))
+    assert (returns.loc[returns.index.dayofweek >= 5, "STK"] == 0).all()
+    assert (returns["NOHIST"] == 0).all()
+
+
+def test_daily_totals_are_sampled_and_terminal_values_kept():
+    calendar = pd.date_range("2024-01-01", periods=200)
+    rng = np.random.default_rng(3)
+    prices = pd.DataFrame({"BTC": np.exp(np.cumsum(rng.normal(0, 0.03, len(calendar))))}, index=calendar)
+
+    result = scenarios.simulate({"BTC": 100.0}, prices, horizon=30, n_paths=5 * scenarios.SAMPLE_PATHS, max_chunk_mb=0.05)
+    assert result["terminal"].shape == (5 * scenarios.SAMPLE_PATHS,)
+    assert scenarios.SAMPLE_PATHS <= len(result["sample"]) < 1.1 * scenarios.SAMPLE_PATHS
+    assert result["percentiles"].shape == (30, len(scenarios.PERCENTILES))
+    assert np.isclose(scenarios.summarize(result)["mean"], result["terminal"].mean())
+
+
+def test_ars_stock_flat_in_usd_is_not_devalued_twice():
+    calendar = pd.date_range("2024-01-01", periods=200)
+    rng = np.random.default_rng(5)
+    ars_usd = 800 * np.exp(np.cumsum(rng.normal(0.002, 0.01, len(calendar))))
+    # Priced in ARS, so its ARS price follows the peso: flat in USD
+    prices = pd.DataFrame({"GGAL": 5.0 * ars_usd, scenarios.FX_COLUMN: ars_usd}, index=calendar)
+
+    for devaluation in ["No devaluation", "Historical"]:
+        result = scenarios.simulate({"GGAL": 100.0}, prices, ["GGAL"], horizon=60, n_paths=500, devaluation=devaluation)
+        assert np.allclose(result["terminal"], 100.0)
+        assert np.allclose(result["percentiles"], 100.0)
+
+    pegged = scenarios.simulate({"GGAL": 100.0}, prices, ["GGAL"], horizon=60, n_paths=500,
+                                devaluation="Crawling peg (2%/month)")
+    assert scenarios.summarize(pegged)["P50"] < 100.0
@@ -1,4 +1,33 @@
-import streamlit as st
+import functools
+import importlib
+import os
+import sys
+import tomllib
+
+# Used when running headless (CLI/cron) instead of under `streamlit run`
+SECRETS_PATH = os.environ.get("INVESTMENTS_SECRETS", os.path.join(".streamlit", "secrets.toml"))
+
+class LazyModule:
+    """
+    Module proxy that imports the real module on first attribute access.
+    Keeps heavy provider/storage stacks (yfinance, gspread) off the cold-start path.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
 
 def safe_float(value):
     """Safely convert string with thousands separators and dot decimal to float"""
@@ -26,8 +55,22 @@ def safe_float(value):
         except ValueError:
             return 0.0
 
+@functools.lru_cache(maxsize=1)
+def _load_secrets_file(path):
+    try:
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    except (OSError, tomllib.TOMLDecodeError):
+        return {}
+
 def get_secret(key):
-    """Safely get a secret from st.secrets to avoid StreamlitSecretNotFoundError"""
+    """
+    Safely get a secret from st.secrets to avoid StreamlitSecretNotFoundError.
+    Without Streamlit loaded (CLI), read the same secrets.toml directly.
+    """
+    st = sys.modules.get("streamlit")
+    if st is None:
+        return _load_secrets_file(SECRETS_PATH).get(key)
     try:
         return st.secrets.get(key)
     except Exception: